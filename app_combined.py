@@ -7,6 +7,9 @@ import plotly.graph_objects as go
 import os
 from datetime import datetime, timedelta
 
+from csat_processor import codificar_avaliacoes, deduplicar_csat
+from eloca_client import obter_cliente_eloca
+
 # --- Configuração da Página ---
 st.set_page_config(
     page_title="Dashboard de Indicadores Eloca",
@@ -20,7 +23,7 @@ st.set_page_config(
 def carregar_dados_operacionais(url, headers):
     """Carrega e trata os dados operacionais da Eloca."""
     try:
-        resposta = requests.get(url, headers=headers)
+        resposta = obter_cliente_eloca().get(url, headers=headers)
         resposta.raise_for_status()  # Lança um erro para códigos de status ruins (4xx ou 5xx)
         arquivo = BytesIO(resposta.content)
         df = pd.read_excel(arquivo)
@@ -49,7 +52,7 @@ def carregar_dados_operacionais(url, headers):
 def carregar_dados_csat(url, headers):
     """Carrega, trata e aplica a regra de desduplicação nos dados de CSAT."""
     try:
-        resposta = requests.get(url, headers=headers)
+        resposta = obter_cliente_eloca().get(url, headers=headers)
         resposta.raise_for_status()
         arquivo = BytesIO(resposta.content)
         df = pd.read_excel(arquivo)
@@ -61,20 +64,14 @@ def carregar_dados_csat(url, headers):
             return df
         
         df.rename(columns={coluna_avaliacao: "Avaliacao_Qualidade"}, inplace=True)
+        # Nota (1-5) e indicador Bom/Ótimo calculados uma vez por texto distinto; as páginas leem a coluna "Nota"
+        df = df.assign(**codificar_avaliacoes(df["Avaliacao_Qualidade"]))
         
         # --- Lógica de Desduplicação do CSAT ---
-        df["Avaliacao_Qualidade"] = df["Avaliacao_Qualidade"].astype(str)
-        
-        # 1. Ordenar para priorizar as melhores avaliações
-        df["prioridade_avaliacao"] = df["Avaliacao_Qualidade"].apply(
-            lambda x: 1 if x.startswith("Ótimo") else (2 if x.startswith("Bom") else 3)
-        )
-        df_sorted = df.sort_values(by=["Código do Chamado", "prioridade_avaliacao"])
-        
-        # 2. Manter apenas a primeira ocorrência após a ordenação
-        df_final = df_sorted.drop_duplicates(subset="Código do Chamado", keep="first")
+        # Mesma regra do CSATProcessor: primeira avaliação Bom/Ótimo do código ou, se não houver, o primeiro registro
+        df_final, _ = deduplicar_csat(df, coluna_avaliacao="Avaliacao_Qualidade")
         
-        return df_final.drop(columns=["prioridade_avaliacao"])
+        return df_final
         
     except requests.exceptions.RequestException as e:
         st.error(f"Erro de conexão ao buscar dados de CSAT: {e}")
@@ -175,7 +172,6 @@ if pagina_selecionada == "Resultados Área 1 (TMA, TME, TMR)":
                                                  left_on="Código do Chamado", right_on="Nº Chamado", how="left")
             df_csat_merged_for_graph.dropna(subset=["Data de Criação"], inplace=True)
             df_csat_merged_for_graph["Data de Criação"] = df_csat_merged_for_graph["Data de Criação"].dt.date
-            df_csat_merged_for_graph["Nota"] = pd.to_numeric(df_csat_merged_for_graph["Avaliacao_Qualidade"].str[0], errors="coerce")
 
             csat_daily = df_csat_merged_for_graph.groupby("Data de Criação").agg(
                 CSAT_Analista=("Nota", "mean")
@@ -227,7 +223,6 @@ elif pagina_selecionada == "Resultados Área 2 (CSAT)":
         
         if not df_csat_filtrado.empty:
             total_respostas = len(df_csat_filtrado)
-            df_csat_filtrado["Nota"] = pd.to_numeric(df_csat_filtrado["Avaliacao_Qualidade"].str[0], errors="coerce")
             media_notas = df_csat_filtrado["Nota"].mean()
             satisfeitos = df_csat_filtrado[df_csat_filtrado["Nota"].isin([4, 5])].shape[0]
             percent_satisfeitos = (satisfeitos / total_respostas * 100) if total_respostas > 0 else 0
@@ -382,7 +377,6 @@ elif pagina_selecionada == "Metas Individuais":
         df_csat_filtrado = df_csat_merged[df_csat_merged["Nome Completo do Operador"].isin(analista_selecionado)]
         
         if not df_csat_filtrado.empty:
-            df_csat_filtrado["Nota"] = pd.to_numeric(df_csat_filtrado["Avaliacao_Qualidade"].str[0], errors="coerce")
             resultados_csat = df_csat_filtrado.groupby("Nome Completo do Operador").agg(
                 CSAT_Realizado=("Nota", "mean")
             ).reset_index()
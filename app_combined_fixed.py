@@ -1,14 +1,30 @@
 import streamlit as st
 import pandas as pd
-import requests
-from io import BytesIO
+import logging
 import plotly.express as px
 import plotly.graph_objects as go
 import os
 from datetime import datetime, timedelta
+
+from config import Config
+from background_refresher import BackgroundRefresher
+from cache_resultados import obter_cache_resultados
+from column_registry import assinatura_colunas, filtro_usecols, registrar_colunas
+from csat_agregado import AgregadoCSAT
+from csat_processor import codificar_avaliacoes, deduplicar_csat
+from cubo_diario import CuboDiario
+from metricas_analista import COLUNA_ATENDIMENTOS, metricas_por_analista
+from download_cache import obter_download_cache
+from indice_bitmap import IndiceBitmap
+from schema import COLUNA_AVALIACAO_CSAT, aplicar_schema
+from single_flight import obter_single_flight
+from ticket_store import IndiceTemporal, obter_ticket_store
+
 st.write("Iniciando a execução do app_combined_fixed.py")
 print("DEBUG: App iniciado")
 
+logger = logging.getLogger(__name__)
+
 # --- Configuração da Página ---
 st.set_page_config(
     page_title="Dashboard de Indicadores Eloca",
@@ -16,74 +32,272 @@ st.set_page_config(
     layout="wide"
 )
 
+# --- Colunas Lidas por Cada Página ---
+# Apenas a união destas colunas é lida do Excel (ver column_registry)
+
+# Dimensões filtráveis pela barra lateral, indexadas em bitmaps (as ausentes na exportação são ignoradas)
+DIMENSOES_FILTRO = ["Nome Completo do Operador", "Área", "Canal de Atendimento", "Tipo de Problema"]
+registrar_colunas("operacional", "Filtros Globais", ["Data de Criação", *DIMENSOES_FILTRO])
+registrar_colunas("operacional", "Resultados Área 1", [
+    "Nº Chamado", "Data de Criação", "Tempo Útil até o primeiro atendimento",
+    "Tempo Útil até o segundo atendimento", "Tempo Útil da Resolução"
+])
+registrar_colunas("operacional", "Resultados Área 2", [
+    "Nº Chamado", "Nome Completo do Operador", "Data de Criação", "SLA 1º Atendimento", "SLA Resolução"
+])
+registrar_colunas("operacional", "Gráficos Individuais", [
+    "Nº Chamado", "Nome Completo do Operador", "Tempo Útil até o Segundo Atendimento",
+    "SLA 1º Atendimento", "SLA Resolução"
+])
+registrar_colunas("operacional", "Metas Individuais", [
+    "Nº Chamado", "Nome Completo do Operador", "Tempo Útil até o Segundo Atendimento",
+    "Tempo Útil até o Primeiro Atendimento"
+])
+registrar_colunas("csat", "Páginas de CSAT", ["Código do Chamado", COLUNA_AVALIACAO_CSAT])
+
 # --- Funções de Carregamento e Tratamento de Dados ---
 
-@st.cache_data(ttl=3600) # Cache de 1 hora
-def carregar_dados_operacionais(url, headers):
-    """Carrega e trata os dados operacionais da Eloca."""
-    try:
-        resposta = requests.get(url, headers=headers)
-        resposta.raise_for_status()  # Lança um erro para códigos de status ruins (4xx ou 5xx)
-        arquivo = BytesIO(resposta.content)
-        df = pd.read_excel(arquivo)
-        
-        # --- Limpeza e Conversão de Tipos ---
-        # Colunas de data/hora (combinando de 1.py e 2.py)
-        for col in ["Data de Criação", "Data da Primeira Resposta", "Data da Resolução", 
-                    "Data do Primeiro Atendimento", "Data do Segundo Atendimento", "Data de Finalização"]:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors="coerce")
-
-        # Colunas de tempo para numérico (minutos) (combinando de 1.py e 2.py)
-        for col in df.columns:
-            if "Tempo Útil" in col:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-        
+def tratar_dados_operacionais(df):
+    """Aplica a limpeza e a conversão de tipos aos dados operacionais recém-lidos."""
+    # --- Limpeza e Conversão de Tipos ---
+    # Datas, colunas "Tempo Útil" (minutos), SLA e operador conforme declarado em schema.py
+    return aplicar_schema(df, "operacional")
+
+def tratar_dados_csat(df):
+    """Aplica a regra de desduplicação nos dados de CSAT recém-lidos."""
+    # Coluna de avaliação (usando a mais específica de 2.py)
+    coluna_avaliacao = COLUNA_AVALIACAO_CSAT
+    if coluna_avaliacao not in df.columns:
+        logger.warning("Coluna de avaliação do CSAT não encontrada. Verifique o nome da coluna.")
         return df
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro de conexão ao buscar dados operacionais: {e}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro ao processar dados operacionais: {e}")
-        return pd.DataFrame()
-
-@st.cache_data(ttl=3600) # Cache de 1 hora
+    
+    df.rename(columns={coluna_avaliacao: "Avaliacao_Qualidade"}, inplace=True)
+    # Nota (1-5) e indicador Bom/Ótimo calculados uma vez por texto distinto; as páginas leem a coluna "Nota"
+    df = df.assign(**codificar_avaliacoes(df["Avaliacao_Qualidade"]))
+    
+    # --- Lógica de Desduplicação do CSAT ---
+    # Mesma regra do CSATProcessor: primeira avaliação Bom/Ótimo do código ou, se não houver, o primeiro registro
+    df_final, _ = deduplicar_csat(df, coluna_avaliacao="Avaliacao_Qualidade")
+    
+    return aplicar_schema(df_final, "csat")
+
+def carregar_dados_operacionais(url, headers):
+    """
+    Carrega e trata os dados operacionais da Eloca, devolvendo (dados, hash do conteúdo baixado).
+    Erros são propagados ao atualizador.
+    """
+    # Chamadas concorrentes para a mesma URL aguardam a carga em andamento
+    return obter_single_flight().executar(("operacional", url), _carregar_dados_operacionais, url, headers)
+
+def _carregar_dados_operacionais(url, headers):
+    # Revalida a cópia em disco; se o conteúdo não mudou, o parse anterior é reaproveitado
+    cache = obter_download_cache()
+    download = cache.buscar(url, headers)
+    df = cache.obter_frame(
+        f"operacional#{assinatura_colunas('operacional')}", download["content_hash"],
+        lambda: tratar_dados_operacionais(pd.read_excel(download["caminho"], usecols=filtro_usecols("operacional")))
+    )
+    if Config.INGESTAO_INCREMENTAL:
+        # A exportação entra como delta na base local; chamados fora da janela exportada são mantidos
+        base = obter_ticket_store("operacional")
+        if download["alterado"] or base.vazia:
+            base.upsert(df, last_modified=download["last_modified"])
+        return base.dados(), download["content_hash"]
+    return df, download["content_hash"]
+
 def carregar_dados_csat(url, headers):
-    """Carrega, trata e aplica a regra de desduplicação nos dados de CSAT."""
-    try:
-        resposta = requests.get(url, headers=headers)
-        resposta.raise_for_status()
-        arquivo = BytesIO(resposta.content)
-        df = pd.read_excel(arquivo)
-
-        # Coluna de avaliação (usando a mais específica de 2.py)
-        coluna_avaliacao = "Atendimento - CES e CSAT - [ANALISTA] Como você avalia a qualidade do atendimento prestado pelo analista neste chamado?"
-        if coluna_avaliacao not in df.columns:
-            st.warning("Coluna de avaliação do CSAT não encontrada. Verifique o nome da coluna.")
-            return df
-        
-        df.rename(columns={coluna_avaliacao: "Avaliacao_Qualidade"}, inplace=True)
-        
-        # --- Lógica de Desduplicação do CSAT ---
-        df["Avaliacao_Qualidade"] = df["Avaliacao_Qualidade"].astype(str)
-        
-        # 1. Ordenar para priorizar as melhores avaliações
-        df["prioridade_avaliacao"] = df["Avaliacao_Qualidade"].apply(
-            lambda x: 1 if x.startswith("Ótimo") else (2 if x.startswith("Bom") else 3)
+    """
+    Carrega, trata e aplica a regra de desduplicação nos dados de CSAT, devolvendo (dados, hash
+    do conteúdo baixado). Erros são propagados ao atualizador.
+    """
+    return obter_single_flight().executar(("csat", url), _carregar_dados_csat, url, headers)
+
+def _carregar_dados_csat(url, headers):
+    cache = obter_download_cache()
+    download = cache.buscar(url, headers)
+    df = cache.obter_frame(
+        f"csat#{assinatura_colunas('csat')}", download["content_hash"],
+        lambda: tratar_dados_csat(pd.read_excel(download["caminho"], usecols=filtro_usecols("csat")))
+    )
+    return df, download["content_hash"]
+
+@st.cache_resource
+def obter_atualizador(fonte, url, headers):
+    """Cria, uma única vez por processo, o atualizador em segundo plano de uma fonte."""
+    carregadores = {"operacional": carregar_dados_operacionais, "csat": carregar_dados_csat}
+    return BackgroundRefresher(fonte, lambda: carregadores[fonte](url, headers), ttl=Config.CACHE_TTL).iniciar()
+
+@st.cache_resource(max_entries=2)
+def obter_base_completa(fonte, versao, url, headers):
+    """
+    Exportação com todas as colunas, para a página Base de Dados Completa. Os loaders leem
+    só as colunas registradas; esta leitura completa só acontece quando a página é aberta,
+    uma vez por versão do snapshot, e o parse é reaproveitado enquanto o conteúdo não mudar.
+    """
+    cache = obter_download_cache()
+    download = cache.buscar(url, headers)
+    tratar = {"operacional": tratar_dados_operacionais, "csat": tratar_dados_csat}[fonte]
+    return cache.obter_frame(
+        f"{fonte}#completo", download["content_hash"], lambda: tratar(pd.read_excel(download["caminho"]))
+    )
+
+def filtrar_base_completa(df):
+    """Aplica a seleção atual (período, analistas e demais dimensões) à exportação completa."""
+    mascara = pd.Series(True, index=df.index)
+    if filtro_inicio is not None:
+        datas_criacao = df["Data de Criação"]
+        mascara &= (datas_criacao >= filtro_inicio) & (datas_criacao < filtro_fim + pd.Timedelta(days=1))
+    if filtro_analistas is not None:
+        mascara &= df["Nome Completo do Operador"].isin(filtro_analistas)
+    for dimensao, valores in filtro_dimensoes:
+        mascara &= df[dimensao].isin(valores)
+    return df[mascara]
+
+def construir_agregado_csat(df_csat, df_operacional):
+    """Agregado de CSAT por (operador, dia de criação do chamado) de todas as respostas."""
+    df_csat_chamados = pd.merge(
+        df_csat[["Código do Chamado", "Nota", "Avaliacao_Positiva"]],
+        df_operacional[["Nº Chamado", "Nome Completo do Operador", "Data de Criação"]],
+        left_on="Código do Chamado", right_on="Nº Chamado", how="left"
+    )
+    return AgregadoCSAT.a_partir_de(df_csat_chamados, "Nome Completo do Operador", "Data de Criação")
+
+def atualizar_agregado_csat(agregado, df_csat, alteracao):
+    """
+    Novo agregado com as respostas dos chamados do upsert movidas para o operador e o dia
+    atuais: as dos chamados alterados saem de onde estavam, as dos inseridos saem da
+    posição sem operador e sem data, onde o merge à esquerda as tinha deixado.
+    """
+    agregado = agregado.copia()
+    novos = alteracao["novos"]
+    respostas = df_csat.loc[df_csat["Código do Chamado"].isin(novos["Nº Chamado"]),
+                            ["Código do Chamado", "Nota", "Avaliacao_Positiva"]]
+    if respostas.empty:
+        return agregado
+    colunas = ["Nº Chamado", "Nome Completo do Operador", "Data de Criação"]
+    for chamados, sinal in ((alteracao["anteriores"], -1), (novos, 1)):
+        celulas = pd.merge(respostas, chamados[colunas], left_on="Código do Chamado", right_on="Nº Chamado", how="left")
+        agregado.adicionar(celulas["Nome Completo do Operador"], celulas["Data de Criação"],
+                           celulas["Nota"], celulas["Avaliacao_Positiva"], sinal=sinal)
+    return agregado
+
+@st.cache_resource(max_entries=1)
+def obter_agregado_csat(versao_csat, versao_operacional, _df_csat, _df_operacional):
+    """
+    Agregado de CSAT por (operador, dia de criação do chamado), construído uma vez
+    por par de snapshots. As páginas de CSAT consultam o agregado em vez de refazer
+    o merge com os chamados e o groupby sobre as respostas.
+
+    Na ingestão incremental o agregado fica com a base local de chamados, que a cada
+    upsert só move as respostas dos chamados do delta; um novo snapshot de CSAT o
+    reconstrói.
+    """
+    if _df_csat.empty or _df_operacional.empty:
+        return AgregadoCSAT()
+    if Config.INGESTAO_INCREMENTAL:
+        base = obter_ticket_store("operacional")
+        base.manter_agregado(
+            "agregado_csat", versao_csat, lambda dados: construir_agregado_csat(_df_csat, dados),
+            lambda agregado, dados, alteracao: atualizar_agregado_csat(agregado, _df_csat, alteracao)
         )
-        df_sorted = df.sort_values(by=["Código do Chamado", "prioridade_avaliacao"])
-        
-        # 2. Manter apenas a primeira ocorrência após a ordenação
-        df_final = df_sorted.drop_duplicates(subset="Código do Chamado", keep="first")
-        
-        return df_final.drop(columns=["prioridade_avaliacao"])
-        
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro de conexão ao buscar dados de CSAT: {e}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro ao processar dados de CSAT: {e}")
-        return pd.DataFrame()
+        agregado = base.agregado("agregado_csat", _df_operacional)
+        if agregado is not None:
+            return agregado
+    return construir_agregado_csat(_df_csat, _df_operacional)
+
+# Medidas diárias dos gráficos de Resultados (nome no cubo -> coluna operacional)
+MEDIDAS_DIARIAS = {
+    "TME": "Tempo Útil até o primeiro atendimento",
+    "TMA": "Tempo Útil até o segundo atendimento",
+    "TMR": "Tempo Útil da Resolução",
+    "SLA 1º Atendimento": "SLA 1º Atendimento",
+    "SLA Resolução": "SLA Resolução",
+}
+
+@st.cache_resource(max_entries=1)
+def obter_indice_temporal(versao_operacional, _df_operacional):
+    """Chamados ordenados por 'Data de Criação', com os limites do período em cache; uma vez por snapshot."""
+    return IndiceTemporal(_df_operacional, "Data de Criação")
+
+@st.cache_resource(max_entries=1)
+def obter_indice_bitmap(versao_operacional, _df_operacional):
+    """Bitmaps por valor das dimensões de filtro, sobre as linhas já ordenadas por data; uma vez por snapshot."""
+    return IndiceBitmap(_df_operacional, DIMENSOES_FILTRO)
+
+def construir_cubo_operacional(df_operacional):
+    return CuboDiario.a_partir_de(df_operacional, "Data de Criação", "Nome Completo do Operador", "Nº Chamado", MEDIDAS_DIARIAS)
+
+@st.cache_resource(max_entries=1)
+def obter_cubo_operacional(versao_operacional, _df_operacional):
+    """
+    Cubo diário por (dia de criação, operador), construído uma vez por snapshot.
+    Os gráficos diários fatiam o cubo pelo período e pelos operadores selecionados.
+
+    Na ingestão incremental o cubo fica com a base local de chamados, que a cada
+    upsert recalcula só os dias afetados pelo delta.
+    """
+    if Config.INGESTAO_INCREMENTAL:
+        base = obter_ticket_store("operacional")
+        base.manter_agregado(
+            "cubo", None, construir_cubo_operacional,
+            lambda cubo, dados, alteracao: cubo.atualizar_dias(alteracao["linhas_dos_dias"], alteracao["dias_afetados"])
+        )
+        cubo = base.agregado("cubo", _df_operacional)
+        if cubo is not None:
+            return cubo
+    return construir_cubo_operacional(_df_operacional)
+
+def em_cache(nome, funcao, *args):
+    """
+    `funcao(filtro_inicio, filtro_fim, filtro_analistas, filtro_dimensoes, *args)`, memorizada no
+    cache de resultados do processo por (snapshot, seleção atual). `args` entram na chave e
+    precisam ser hashable; o resultado é compartilhado entre sessões e não deve ser alterado.
+    """
+    filtro = (filtro_inicio, filtro_fim, filtro_analistas, filtro_dimensoes)
+    return obter_cache_resultados().obter((nome, versao_snapshot, filtro, args), funcao, *filtro, *args,
+                                          versao=versao_snapshot)
+
+def filtrar_operacional(inicio, fim, analistas, dimensoes):
+    """
+    Chamados do período (dias inclusivos), dos analistas selecionados e dos valores
+    selecionados das demais dimensões ((dimensão, valores), ...); None não filtra.
+    """
+    # Busca binária no índice temporal; o último dia selecionado entra inteiro, como no cubo diário
+    posicoes = slice(None) if inicio is None else indice_temporal.posicoes(inicio, fim + pd.Timedelta(days=1))
+    # OR entre os valores de cada dimensão e AND entre as dimensões, nos bitmaps do snapshot
+    filtros = {"Nome Completo do Operador": analistas, **dict(dimensoes)}
+    return indice_bitmap.filtrar(df_operacional, filtros, posicoes)
+
+def medias_diarias(inicio, fim, analistas, dimensoes, medidas):
+    """Médias diárias e 'Chamados' distintos lidos do cubo, com a coluna 'Data de Criação' (date)."""
+    if dimensoes:
+        # O cubo é por (dia, operador); com outras dimensões filtradas, agrega só as linhas selecionadas
+        cubo = CuboDiario.a_partir_de(em_cache("operacional_filtrado", filtrar_operacional),
+                                      "Data de Criação", "Nome Completo do Operador", "Nº Chamado", MEDIDAS_DIARIAS)
+    else:
+        cubo = cubo_operacional
+    diario = cubo.por_dia(medidas, analistas, inicio, fim).reindex(columns=[*medidas, "Chamados"])
+    diario.index = diario.index.date
+    return diario.rename_axis("Data de Criação").reset_index()
+
+def diario_filtrado(medidas):
+    """Médias diárias e 'Chamados' distintos da seleção atual."""
+    return em_cache("diario", medias_diarias, tuple(medidas))
+
+def cards_operacionais(inicio, fim, analistas, dimensoes, analistas_card, medidas):
+    """Valores operacionais dos cards, numa única agregação por operador."""
+    return metricas_por_analista(df_operacional_filtrado, "Nome Completo do Operador", "Nº Chamado", dict(medidas), analistas_card)
+
+def obter_dados(fonte, url, headers, descricao):
+    """
+    Retorna (dados, versao) do último snapshot bom da fonte; a versão chaveia tudo o que é
+    derivado desses dados. Só a primeira carga do processo espera pelo download.
+    """
+    try:
+        return obter_atualizador(fonte, url, headers).obter()
+    except RuntimeError as e:
+        st.error(f"Erro ao carregar dados {descricao}: {e}")
+        return pd.DataFrame(), 0
 
 # --- Carregamento dos Dados Usando Secrets ---
 URL_OPERACIONAL = st.secrets["ELOCA_URL"]
@@ -92,16 +306,33 @@ HEADERS_OPERACIONAL = {"DeskManager": st.secrets["DESKMANAGER_TOKEN"]}
 URL_CSAT = st.secrets["CSAT_URL"]
 HEADERS_CSAT = {"DeskManager": st.secrets["CSAT_TOKEN"]}
 
-df_operacional = carregar_dados_operacionais(URL_OPERACIONAL, HEADERS_OPERACIONAL)
-df_csat = carregar_dados_csat(URL_CSAT, HEADERS_CSAT)
+# Os dois atualizadores carregam em paralelo; as sessões recebem o último snapshot pronto
+obter_atualizador("operacional", URL_OPERACIONAL, HEADERS_OPERACIONAL)
+obter_atualizador("csat", URL_CSAT, HEADERS_CSAT)
+df_operacional, versao_operacional = obter_dados("operacional", URL_OPERACIONAL, HEADERS_OPERACIONAL, "operacionais")
+df_csat, versao_csat = obter_dados("csat", URL_CSAT, HEADERS_CSAT, "de CSAT")
+indice_temporal = None
+if not df_operacional.empty and "Data de Criação" in df_operacional.columns:
+    # Daqui em diante os chamados ficam ordenados por data, e o período é resolvido por busca binária
+    indice_temporal = obter_indice_temporal(versao_operacional, df_operacional)
+    df_operacional = indice_temporal.df
+indice_bitmap = obter_indice_bitmap(versao_operacional, df_operacional)
+agregado_csat = obter_agregado_csat(versao_csat, versao_operacional, df_csat, df_operacional)
+cubo_operacional = obter_cubo_operacional(versao_operacional, df_operacional)
+# Identifica o snapshot nas chaves do cache de resultados
+versao_snapshot = (versao_operacional, versao_csat)
 
 # --- Barra Lateral de Filtros ---
 st.sidebar.header("Filtros Globais")
 
+# Seleção atual, em forma canônica: aplicada aos chamados e ao cubo diário e usada
+# como chave do cache de resultados (None = sem filtro)
+filtro_inicio, filtro_fim, filtro_analistas, filtro_dimensoes = None, None, None, ()
+
 # Filtro de Período (usando a lógica de 1.py, mais robusta)
-if not df_operacional.empty and "Data de Criação" in df_operacional.columns:
-    data_min = df_operacional["Data de Criação"].min().date()
-    data_max = df_operacional["Data de Criação"].max().date()
+if indice_temporal is not None and indice_temporal.data_min is not None:
+    data_min = indice_temporal.data_min.date()
+    data_max = indice_temporal.data_max.date()
     
     data_selecionada = st.sidebar.date_input(
         "Selecione o Período",
@@ -110,26 +341,43 @@ if not df_operacional.empty and "Data de Criação" in df_operacional.columns:
         max_value=data_max,
     )
     if len(data_selecionada) == 2:
-        start_date, end_date = pd.to_datetime(data_selecionada[0]), pd.to_datetime(data_selecionada[1])
-        df_operacional_filtrado = df_operacional[df_operacional["Data de Criação"].between(start_date, end_date)]
-    else:
-        df_operacional_filtrado = df_operacional.copy()
+        filtro_inicio, filtro_fim = pd.to_datetime(data_selecionada[0]), pd.to_datetime(data_selecionada[1])
+    df_operacional_filtrado = em_cache("operacional_filtrado", filtrar_operacional)
 else:
     df_operacional_filtrado = pd.DataFrame()
     st.sidebar.warning("Dados operacionais ou coluna 'Data de Criação' não disponíveis para filtro.")
 
 # Filtro de Analista (usando a coluna de 2.py, que parece mais consistente)
 if not df_operacional_filtrado.empty and "Nome Completo do Operador" in df_operacional_filtrado.columns:
-    lista_analistas = sorted(df_operacional_filtrado["Nome Completo do Operador"].dropna().unique())
+    lista_analistas = em_cache(
+        "analistas_periodo", lambda *filtro: sorted(df_operacional_filtrado["Nome Completo do Operador"].dropna().unique())
+    )
     analista_selecionado = st.sidebar.multiselect(
         "Selecione o(s) Analista(s)",
         options=lista_analistas,
         default=lista_analistas
     )
-    df_operacional_filtrado = df_operacional_filtrado[df_operacional_filtrado["Nome Completo do Operador"].isin(analista_selecionado)]
+    filtro_analistas = tuple(sorted(analista_selecionado))
 else:
     st.sidebar.warning("Coluna 'Nome Completo do Operador' não disponível para filtro.")
 
+# Demais dimensões presentes na exportação; com todos os valores marcados a dimensão não filtra
+for dimensao in DIMENSOES_FILTRO[1:]:
+    if not df_operacional_filtrado.empty and dimensao in indice_bitmap.dimensoes:
+        opcoes = indice_bitmap.valores(dimensao)
+        selecionados = st.sidebar.multiselect(f"Selecione {dimensao}", options=opcoes, default=opcoes)
+        if len(selecionados) < len(opcoes):
+            filtro_dimensoes += ((dimensao, tuple(sorted(selecionados))),)
+
+if not df_operacional_filtrado.empty:
+    df_operacional_filtrado = em_cache("operacional_filtrado", filtrar_operacional)
+
+estatisticas_cache = obter_cache_resultados().estatisticas()
+st.sidebar.caption(
+    f"Cache de resultados: {estatisticas_cache['acertos']} acertos, {estatisticas_cache['faltas']} faltas, "
+    f"{estatisticas_cache['bytes'] / 1024 / 1024:.1f} de {estatisticas_cache['max_bytes'] / 1024 / 1024:.0f} MB"
+)
+
 
 # --- Navegação Principal ---
 st.sidebar.title("Navegação")
@@ -150,9 +398,10 @@ if pagina_selecionada == "Resultados Área 1 (TMA, TME, TMR)":
     
     if not df_operacional_filtrado.empty:
         # Cálculos dos KPIs (combinando de 1.py e 2.py, priorizando colunas de 1.py)
-        tme = df_operacional_filtrado["Tempo Útil até o primeiro atendimento"].mean() if "Tempo Útil até o primeiro atendimento" in df_operacional_filtrado.columns else 0
-        tma = df_operacional_filtrado["Tempo Útil até o segundo atendimento"].mean() if "Tempo Útil até o segundo atendimento" in df_operacional_filtrado.columns else 0
-        tmr = df_operacional_filtrado["Tempo Útil da Resolução"].mean() if "Tempo Útil da Resolução" in df_operacional_filtrado.columns else 0
+        tme, tma, tmr = em_cache("tempos_medios", lambda *filtro: tuple(
+            df_operacional_filtrado[coluna].mean() if coluna in df_operacional_filtrado.columns else 0
+            for coluna in ["Tempo Útil até o primeiro atendimento", "Tempo Útil até o segundo atendimento", "Tempo Útil da Resolução"]
+        ))
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Tempo Médio de Espera (TME)", f"{tme:.2f} min")
@@ -162,26 +411,19 @@ if pagina_selecionada == "Resultados Área 1 (TMA, TME, TMR)":
         st.markdown("---")
         st.subheader("Evolução Diária dos Tempos Médios")
         
-        df_diario = df_operacional_filtrado.groupby(df_operacional_filtrado["Data de Criação"].dt.date).agg({
-            "Tempo Útil até o primeiro atendimento": "mean",
-            "Tempo Útil até o segundo atendimento": "mean",
-            "Tempo Útil da Resolução": "mean"
-        }).reset_index()
-        df_diario.columns = ["Data de Criação", "TME", "TMA", "TMR"]
+        # Médias diárias lidas do cubo, fatiado pelo período e pelos analistas selecionados
+        df_diario = diario_filtrado(["TME", "TMA", "TMR"])
 
         # Gráfico de CSAT do Analista e da Ferramenta (adaptado da imagem)
         # Assumindo que o CSAT do Analista e da Ferramenta viriam de df_csat ou de um merge com df_operacional
         # Para replicar a imagem, vamos criar dados fictícios ou usar o CSAT processado se disponível
         if not df_csat.empty:
-            df_csat_merged_for_graph = pd.merge(df_csat, df_operacional[["Nº Chamado", "Data de Criação"]], 
-                                                 left_on="Código do Chamado", right_on="Nº Chamado", how="left")
-            df_csat_merged_for_graph.dropna(subset=["Data de Criação"], inplace=True)
-            df_csat_merged_for_graph["Data de Criação"] = df_csat_merged_for_graph["Data de Criação"].dt.date
-            df_csat_merged_for_graph["Nota"] = pd.to_numeric(df_csat_merged_for_graph["Avaliacao_Qualidade"].str[0], errors="coerce")
-
-            csat_daily = df_csat_merged_for_graph.groupby("Data de Criação").agg(
-                CSAT_Analista=("Nota", "mean")
-            ).reset_index()
+            # Média diária das notas, lida do agregado por (operador, dia)
+            csat_por_dia = agregado_csat.por_dia()
+            csat_daily = pd.DataFrame({
+                "Data de Criação": csat_por_dia.index.date,
+                "CSAT_Analista": csat_por_dia["Media_Nota"].to_numpy(),
+            })
             # Adicionar CSAT da Ferramenta (fictício para demonstração, ou buscar de outra fonte)
             csat_daily["CSAT da Ferramenta"] = csat_daily["CSAT_Analista"] * 0.95 # Exemplo: 5% menor
             csat_daily["CSAT_Analista"] = csat_daily["CSAT_Analista"] * 100 / 5 # Normalizar para 100%
@@ -221,18 +463,14 @@ elif pagina_selecionada == "Resultados Área 2 (CSAT)":
     st.title("😊 Resultados Área 2: Satisfação do Cliente (CSAT)")
     
     if not df_csat.empty and not df_operacional.empty:
-        # Usando 'Nº Chamado' de 2.py para merge, pois 'Código' de 1.py pode ser ambíguo
-        df_csat_merged = pd.merge(df_csat, df_operacional[["Nº Chamado", "Nome Completo do Operador", "Data de Criação"]], 
-                                  left_on="Código do Chamado", right_on="Nº Chamado", how="left")
-        df_csat_merged.dropna(subset=["Nome Completo do Operador", "Data de Criação"], inplace=True)
-        df_csat_filtrado = df_csat_merged[df_csat_merged["Nome Completo do Operador"].isin(analista_selecionado)]
+        # Respostas ligadas a um chamado (por 'Nº Chamado') com operador e data, dos analistas selecionados
+        resumo_csat = agregado_csat.resumo(analista_selecionado)
         
-        if not df_csat_filtrado.empty:
-            total_respostas = len(df_csat_filtrado)
-            df_csat_filtrado["Nota"] = pd.to_numeric(df_csat_filtrado["Avaliacao_Qualidade"].str[0], errors="coerce")
-            media_notas = df_csat_filtrado["Nota"].mean()
-            satisfeitos = df_csat_filtrado[df_csat_filtrado["Nota"].isin([4, 5])].shape[0]
-            percent_satisfeitos = (satisfeitos / total_respostas * 100) if total_respostas > 0 else 0
+        if resumo_csat["respostas"] > 0:
+            total_respostas = resumo_csat["respostas"]
+            media_notas = resumo_csat["media_nota"]
+            satisfeitos = resumo_csat["satisfeitos"]
+            percent_satisfeitos = resumo_csat["percentual_satisfeitos"]
 
             col1, col2, col3 = st.columns(3)
             col1.metric("Total de Respostas", total_respostas)
@@ -242,16 +480,17 @@ elif pagina_selecionada == "Resultados Área 2 (CSAT)":
             st.markdown("---")
             st.subheader("Distribuição das Notas de Avaliação")
             
-            dist_notas = df_csat_filtrado["Nota"].value_counts().sort_index()
+            dist_notas = pd.Series(resumo_csat["distribuicao_notas"]).sort_index()
             fig = px.bar(dist_notas, x=dist_notas.index, y=dist_notas.values, labels={"x": "Nota", "y": "Quantidade"}, title="Contagem por Nota de Avaliação")
             st.plotly_chart(fig, use_container_width=True)
 
             # Gráfico de SLA 1º Atendimento e SLA Resolução por Data (adaptado da imagem)
-            df_sla_daily = df_operacional_filtrado.groupby(df_operacional_filtrado["Data de Criação"].dt.date).agg(
-                SLA_1_Atendimento=("SLA 1º Atendimento", "mean") if "SLA 1º Atendimento" in df_operacional_filtrado.columns else ("Nº Chamado", lambda x: 0), # Placeholder
-                SLA_Resolucao=("SLA Resolução", "mean") if "SLA Resolução" in df_operacional_filtrado.columns else ("Nº Chamado", lambda x: 0) # Placeholder
-            ).reset_index()
-            df_sla_daily.columns = ["Data de Criação", "SLA 1º Atendimento", "SLA Resolução"]
+            # SLA e total de chamados por dia lidos do cubo; SLA ausente no relatório fica 0 (placeholder)
+            df_diario = diario_filtrado(["SLA 1º Atendimento", "SLA Resolução"])
+            df_sla_daily = df_diario[["Data de Criação", "SLA 1º Atendimento", "SLA Resolução"]].copy()
+            for coluna in ["SLA 1º Atendimento", "SLA Resolução"]:
+                if coluna not in cubo_operacional.medidas:
+                    df_sla_daily[coluna] = 0
             df_sla_daily["SLA 1º Atendimento"] = df_sla_daily["SLA 1º Atendimento"] * 100 # Assumindo que o valor é uma proporção
             df_sla_daily["SLA Resolução"] = df_sla_daily["SLA Resolução"] * 100 # Assumindo que o valor é uma proporção
 
@@ -268,8 +507,7 @@ elif pagina_selecionada == "Resultados Área 2 (CSAT)":
             st.plotly_chart(fig_sla, use_container_width=True)
 
             # Gráfico de Total de Chamados por Data (adaptado da imagem)
-            df_total_chamados_daily = df_operacional_filtrado.groupby(df_operacional_filtrado["Data de Criação"].dt.date)["Nº Chamado"].nunique().reset_index()
-            df_total_chamados_daily.columns = ["Data de Criação", "Total"]
+            df_total_chamados_daily = df_diario[["Data de Criação", "Chamados"]].rename(columns={"Chamados": "Total"})
 
             fig_total_chamados = px.bar(df_total_chamados_daily, x="Data de Criação", y="Total",
                                         title="Total de Chamados por Dia",
@@ -292,6 +530,13 @@ elif pagina_selecionada == "Gráfico Individual 1 (Desempenho Diário)":
 
         # Cards por analista (Elô, Kauan, Pedro, Mateus) - Replicar a estrutura da imagem
         analistas_especificos = ["Elô", "Kauan", "Pedro", "Mateus"]
+        csat_por_analista = agregado_csat.por_analista(analistas_especificos)
+        # Valores operacionais de todos os cards numa única agregação por operador
+        cards = em_cache("cards", cards_operacionais, tuple(analistas_especificos), (
+            ("TMA", "Tempo Útil até o Segundo Atendimento"),
+            ("SLA 1º Atendimento", "SLA 1º Atendimento"),
+            ("SLA Resolução", "SLA Resolução"),
+        ))
         
         # Criar colunas para os cards
         cols_analistas = st.columns(len(analistas_especificos))
@@ -299,21 +544,19 @@ elif pagina_selecionada == "Gráfico Individual 1 (Desempenho Diário)":
         for i, analista in enumerate(analistas_especificos):
             with cols_analistas[i]:
                 st.markdown(f"<div style='background-color: #28a745; padding: 10px; border-radius: 10px; text-align: center; color: white;'><b>{analista}</b></div>", unsafe_allow_html=True)
-                df_analista = df_operacional_filtrado[df_operacional_filtrado["Nome Completo do Operador"] == analista]
+                atendimentos_dia = cards.at[analista, COLUNA_ATENDIMENTOS]
+                tma = cards.at[analista, "TMA"] if "TMA" in cards.columns else 0
                 
-                atendimentos_dia = df_analista["Nº Chamado"].nunique()
-                tma = df_analista["Tempo Útil até o Segundo Atendimento"].mean() if "Tempo Útil até o Segundo Atendimento" in df_analista.columns else 0
-                
-                # Para CSAT e % Resposta Pesquisa, precisamos do df_csat_filtrado
-                df_csat_analista = df_csat_filtrado[df_csat_filtrado["Nome Completo do Operador"] == analista]
-                csat = df_csat_analista["Nota"].mean() if not df_csat_analista.empty else 0
-                total_pesquisas_analista = df_csat_analista["Código do Chamado"].nunique()
-                respostas_pesquisa_analista = df_csat_analista[df_csat_analista["Avaliacao_Qualidade"].notna()]["Código do Chamado"].nunique()
-                percentual_resposta_pesquisa = (respostas_pesquisa_analista / total_pesquisas_analista * 100) if total_pesquisas_analista > 0 else 0
+                # CSAT e % Resposta Pesquisa lidos do agregado por (operador, dia)
+                if analista in csat_por_analista.index:
+                    csat = csat_por_analista.at[analista, "Media_Nota"]
+                    percentual_resposta_pesquisa = csat_por_analista.at[analista, "Com_Nota"] / csat_por_analista.at[analista, "Respostas"] * 100
+                else:
+                    csat, percentual_resposta_pesquisa = 0, 0
 
                 # SLA 1º Atendimento e SLA Resolução (assumindo que estas colunas existem no df_operacional_filtrado)
-                sla_primeiro_atendimento = df_analista["SLA 1º Atendimento"].mean() if "SLA 1º Atendimento" in df_analista.columns else 0
-                sla_resolucao = df_analista["SLA Resolução"].mean() if "SLA Resolução" in df_analista.columns else 0
+                sla_primeiro_atendimento = cards.at[analista, "SLA 1º Atendimento"] if "SLA 1º Atendimento" in cards.columns else 0
+                sla_resolucao = cards.at[analista, "SLA Resolução"] if "SLA Resolução" in cards.columns else 0
 
                 st.markdown(f"<div style='background-color: #e6ffe6; padding: 5px; border-radius: 5px; margin-top: 5px;'>Atendimentos dia: <b>{atendimentos_dia}</b></div>", unsafe_allow_html=True)
                 st.markdown(f"<div style='background-color: #e6ffe6; padding: 5px; border-radius: 5px; margin-top: 5px;'>TMA: <b>{tma:.0f} min</b></div>", unsafe_allow_html=True)
@@ -331,6 +574,10 @@ elif pagina_selecionada == "Gráfico Individual 2 (CSAT por Analista)":
     if not df_csat.empty and not df_operacional.empty:
         # Cards por analista (Jonielson, Rosana, Marcos, Sarah, Graziele, Virgilio) - Replicar a estrutura da imagem
         analistas_especificos = ["Jonielson", "Rosana", "Marcos", "Sarah", "Graziele", "Virgilio"]
+        csat_por_analista = agregado_csat.por_analista(analistas_especificos)
+        cards = em_cache("cards", cards_operacionais, tuple(analistas_especificos), (
+            ("TMA", "Tempo Útil até o Segundo Atendimento"),
+        ))
         
         # Criar colunas para os cards
         cols_analistas = st.columns(len(analistas_especificos))
@@ -338,17 +585,15 @@ elif pagina_selecionada == "Gráfico Individual 2 (CSAT por Analista)":
         for i, analista in enumerate(analistas_especificos):
             with cols_analistas[i]:
                 st.markdown(f"<div style='background-color: #28a745; padding: 10px; border-radius: 10px; text-align: center; color: white;'><b>{analista}</b></div>", unsafe_allow_html=True)
-                df_analista = df_operacional_filtrado[df_operacional_filtrado["Nome Completo do Operador"] == analista]
-                
-                atendimentos_dia = df_analista["Nº Chamado"].nunique()
-                tma = df_analista["Tempo Útil até o Segundo Atendimento"].mean() if "Tempo Útil até o Segundo Atendimento" in df_analista.columns else 0
+                atendimentos_dia = cards.at[analista, COLUNA_ATENDIMENTOS]
+                tma = cards.at[analista, "TMA"] if "TMA" in cards.columns else 0
                 
-                # Para CSAT e % Resposta Pesquisa, precisamos do df_csat_filtrado
-                df_csat_analista = df_csat_filtrado[df_csat_filtrado["Nome Completo do Operador"] == analista]
-                csat = df_csat_analista["Nota"].mean() if not df_csat_analista.empty else 0
-                total_pesquisas_analista = df_csat_analista["Código do Chamado"].nunique()
-                respostas_pesquisa_analista = df_csat_analista[df_csat_analista["Avaliacao_Qualidade"].notna()]["Código do Chamado"].nunique()
-                percentual_resposta_pesquisa = (respostas_pesquisa_analista / total_pesquisas_analista * 100) if total_pesquisas_analista > 0 else 0
+                # CSAT e % Resposta Pesquisa lidos do agregado por (operador, dia)
+                if analista in csat_por_analista.index:
+                    csat = csat_por_analista.at[analista, "Media_Nota"]
+                    percentual_resposta_pesquisa = csat_por_analista.at[analista, "Com_Nota"] / csat_por_analista.at[analista, "Respostas"] * 100
+                else:
+                    csat, percentual_resposta_pesquisa = 0, 0
 
                 st.markdown(f"<div style='background-color: #e6ffe6; padding: 5px; border-radius: 5px; margin-top: 5px;'>Atendimentos dia: <b>{atendimentos_dia}</b></div>", unsafe_allow_html=True)
                 st.markdown(f"<div style='background-color: #e6ffe6; padding: 5px; border-radius: 5px; margin-top: 5px;'>TMA: <b>{tma:.0f} min</b></div>", unsafe_allow_html=True)
@@ -374,20 +619,16 @@ elif pagina_selecionada == "Metas Individuais":
     st.markdown("---")
     
     if not df_operacional_filtrado.empty:
-        resultados_op = df_operacional_filtrado.groupby("Nome Completo do Operador").agg(
+        resultados_op = em_cache("metas_operacional", lambda *filtro: df_operacional_filtrado.groupby("Nome Completo do Operador", observed=True).agg(
             TMA_Realizado=("Tempo Útil até o Segundo Atendimento", "mean"),
             TME_Realizado=("Tempo Útil até o Primeiro Atendimento", "mean")
-        ).reset_index()
+        ).reset_index())
         
-        df_csat_merged = pd.merge(df_csat, df_operacional[["Nº Chamado", "Nome Completo do Operador"]], left_on="Código do Chamado", right_on="Nº Chamado", how="left")
-        df_csat_merged.dropna(subset=["Nome Completo do Operador"], inplace=True)
-        df_csat_filtrado = df_csat_merged[df_csat_merged["Nome Completo do Operador"].isin(analista_selecionado)]
+        csat_por_analista = agregado_csat.por_analista(analista_selecionado, incluir_sem_data=True)
         
-        if not df_csat_filtrado.empty:
-            df_csat_filtrado["Nota"] = pd.to_numeric(df_csat_filtrado["Avaliacao_Qualidade"].str[0], errors="coerce")
-            resultados_csat = df_csat_filtrado.groupby("Nome Completo do Operador").agg(
-                CSAT_Realizado=("Nota", "mean")
-            ).reset_index()
+        if not csat_por_analista.empty:
+            resultados_csat = csat_por_analista["Media_Nota"].rename("CSAT_Realizado") \
+                .rename_axis("Nome Completo do Operador").reset_index()
             df_resultados = pd.merge(resultados_op, resultados_csat, on="Nome Completo do Operador", how="outer")
         else:
             df_resultados = resultados_op.copy()
@@ -419,15 +660,26 @@ elif pagina_selecionada == "Metas Individuais":
 elif pagina_selecionada == "Base de Dados Completa":
     st.title("🗂️ Base de Dados Completa")
     
+    # As demais páginas leem só as colunas registradas (ver column_registry); aqui a exportação
+    # é lida com todas as colunas, apenas quando esta página é aberta
     st.subheader("Dados Operacionais (Filtrados)")
     if not df_operacional_filtrado.empty:
-        st.dataframe(df_operacional_filtrado)
+        try:
+            with st.spinner("Carregando todas as colunas da exportação..."):
+                df_operacional_completo = obter_base_completa("operacional", versao_operacional, URL_OPERACIONAL, HEADERS_OPERACIONAL)
+            st.dataframe(filtrar_base_completa(df_operacional_completo))
+        except Exception as e:
+            st.error(f"Erro ao carregar a base operacional completa: {e}")
     else:
         st.warning("Não há dados operacionais para exibir.")
         
     st.subheader("Dados de CSAT (Tratados e sem filtro de data/analista)")
     if not df_csat.empty:
-        st.dataframe(df_csat)
+        try:
+            with st.spinner("Carregando todas as colunas da exportação..."):
+                st.dataframe(obter_base_completa("csat", versao_csat, URL_CSAT, HEADERS_CSAT))
+        except Exception as e:
+            st.error(f"Erro ao carregar a base de CSAT completa: {e}")
     else:
         st.warning("Não há dados de CSAT para exibir.")
 
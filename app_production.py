@@ -20,6 +20,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
 from data_processor import DataProcessor
+from produtos_lazy import ProdutosLazy
+from background_refresher import BackgroundRefresher
+from single_flight import obter_single_flight
 from visualizations import VisualizationManager
 
 # Inicializar configuração
@@ -95,11 +98,30 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Inicialização do processador de dados
-@st.cache_data(ttl=config.CACHE_TTL, show_spinner=True)
+def _carregar_dados_completos():
+    """
+    Executa a carga completa e a devolve com a assinatura do conteúdo dos relatórios;
+    um resultado vazio conta como falha para manter o snapshot anterior.
+    """
+    dados = DataProcessor().carregar_dados_completos()
+    if not dados:
+        raise RuntimeError("Nenhum dado foi carregado. Verifique as URLs e permissões.")
+    return dados, getattr(dados, "assinatura", None)
+
+@st.cache_resource
+def get_data_refresher():
+    """Retorna o atualizador em segundo plano, criado uma única vez por processo do servidor."""
+    return BackgroundRefresher("dashboard", _carregar_dados_completos, ttl=config.CACHE_TTL).iniciar()
+
 def load_data():
-    """Carrega dados com cache otimizado para produção."""
-    processor = DataProcessor()
-    return processor.carregar_dados_completos()
+    """Retorna o último snapshot bom dos dados, renovado em segundo plano antes do TTL expirar."""
+    with st.spinner("Carregando dados..."):
+        dados, _ = get_data_refresher().obter()
+        return dados
+
+def produtos_calculados(data):
+    """Produtos do snapshot já calculados, sem disparar o cálculo das abas ainda não visitadas."""
+    return data.calculados() if isinstance(data, ProdutosLazy) else dict(data)
 
 # Inicialização do gerenciador de visualizações
 @st.cache_resource
@@ -111,7 +133,10 @@ def render_resumo_geral(data, viz_manager):
     """Renderiza página de resumo geral."""
     st.markdown("## 📊 Resumo Geral dos Dados")
     
-    # Métricas principais
+    # Métricas principais, sobre as abas já calculadas (as demais são calculadas ao abrir a página)
+    if isinstance(data, ProdutosLazy) and data.pendentes():
+        st.caption(f"Abas ainda não calculadas: {', '.join(data.pendentes())}")
+    data = produtos_calculados(data)
     if data:
         total_linhas = sum(len(df) for df in data.values() if df is not None and isinstance(df, pd.DataFrame))
         total_colunas = sum(len(df.columns) for df in data.values() if df is not None and isinstance(df, pd.DataFrame))
@@ -286,11 +311,12 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        # Informações dos dados
+        # Informações dos dados (apenas as abas já calculadas)
         if data:
-            total_linhas = sum(len(df) for df in data.values() if df is not None and isinstance(df, pd.DataFrame))
-            total_colunas = sum(len(df.columns) for df in data.values() if df is not None and isinstance(df, pd.DataFrame))
-            abas_com_dados = len([df for df in data.values() if df is not None and isinstance(df, pd.DataFrame) and len(df) > 0])
+            calculados = produtos_calculados(data)
+            total_linhas = sum(len(df) for df in calculados.values() if df is not None and isinstance(df, pd.DataFrame))
+            total_colunas = sum(len(df.columns) for df in calculados.values() if df is not None and isinstance(df, pd.DataFrame))
+            abas_com_dados = len([df for df in calculados.values() if df is not None and isinstance(df, pd.DataFrame) and len(df) > 0])
             
             st.markdown("### 📋 Dados Carregados")
             st.metric("Total de Linhas", total_linhas)
@@ -299,12 +325,16 @@ def main():
             
             # Última atualização
             st.markdown("### ⏰ Última Atualização")
-            st.write(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
+            status_dados = get_data_refresher().status()
+            if status_dados["carregado_em"]:
+                st.write(datetime.fromtimestamp(status_dados["carregado_em"]).strftime("%d/%m/%Y %H:%M:%S"))
             
             # Informações técnicas
             st.markdown("### ⚙️ Info Técnica")
             st.write(f"**Cache**: {config.CACHE_TTL//60} minutos")
             st.write(f"**Debug**: {'Habilitado' if config.DEBUG_MODE else 'Desabilitado'}")
+            cargas = obter_single_flight().estatisticas()
+            st.write(f"**Cargas**: {cargas['executadas']} executadas, {cargas['coalescidas']} compartilhadas")
     
     # Renderização das páginas
     if selected_page == "resumo":
@@ -0,0 +1,118 @@
+"""
+Atualização em segundo plano dos dados do dashboard (stale-while-revalidate)
+
+Uma thread por processo reconstrói o conjunto de dados pouco antes do TTL
+expirar e troca a referência de forma atômica. As sessões sempre recebem o
+último conjunto bom imediatamente; só a primeira carga do processo espera.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """
+    Mantém o último resultado bem-sucedido de `carregador` e o renova em uma
+    thread daemon a cada `ttl - antecedencia` segundos.
+
+    `carregador` retorna (dados, assinatura), sendo a assinatura uma identificação
+    do conteúdo de origem (ex.: hash dos relatórios). Se ela for igual à do
+    snapshot atual, os dados e a versão são mantidos, e o que for derivado da
+    versão continua valendo; None sempre troca o snapshot.
+
+    Se uma renovação falhar, o resultado anterior continua sendo servido e uma
+    nova tentativa é feita após `intervalo_falha` segundos.
+    """
+
+    def __init__(self, nome: str, carregador: Callable[[], Tuple[Any, Optional[Hashable]]], ttl: Optional[int] = None,
+                 antecedencia: Optional[int] = None, intervalo_falha: Optional[int] = None):
+        self.nome = nome
+        self.carregador = carregador
+        self.ttl = ttl if ttl is not None else Config.CACHE_TTL
+        antecedencia = antecedencia if antecedencia is not None else Config.REFRESH_LEAD_TIME
+        # Antecedência nunca maior que metade do TTL, para TTLs curtos (ex.: testes)
+        self.intervalo = max(1, self.ttl - min(antecedencia, self.ttl // 2))
+        self.intervalo_falha = intervalo_falha if intervalo_falha is not None else Config.REFRESH_RETRY_INTERVAL
+
+        self._lock = threading.Lock()
+        self._primeira_carga = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Trocado como uma única tupla: (dados, carregado_em, versao, assinatura)
+        self._snapshot: Optional[tuple] = None
+        self.ultimo_erro: Optional[str] = None
+
+    def iniciar(self) -> "BackgroundRefresher":
+        """Inicia a thread de atualização (idempotente) e retorna a própria instância."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._executar, name=f"refresher-{self.nome}", daemon=True)
+                self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def _atualizar(self) -> bool:
+        inicio = time.perf_counter()
+        try:
+            dados, assinatura = self.carregador()
+        except Exception as e:
+            self.ultimo_erro = str(e)
+            logger.error(f"Falha ao atualizar '{self.nome}'; mantendo o snapshot anterior: {e}")
+            return False
+
+        anterior = self._snapshot
+        self.ultimo_erro = None
+        if anterior is not None and assinatura is not None and assinatura == anterior[3]:
+            # Mesmo conteúdo: mantém os dados e a versão, só renova o horário da carga
+            self._snapshot = (anterior[0], time.time(), anterior[2], assinatura)
+            logger.info(f"Snapshot '{self.nome}' v{anterior[2]} inalterado após {time.perf_counter() - inicio:.2f}s de carga.")
+            return True
+
+        versao = anterior[2] + 1 if anterior else 1
+        self._snapshot = (dados, time.time(), versao, assinatura)
+        self._primeira_carga.set()
+        logger.info(f"Snapshot '{self.nome}' v{versao} trocado após {time.perf_counter() - inicio:.2f}s de carga.")
+        return True
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            sucesso = self._atualizar()
+            espera = self.intervalo if sucesso else self.intervalo_falha
+            if not sucesso and not self._primeira_carga.is_set():
+                # Sem snapshot algum: libera quem está esperando para que veja o erro
+                self._primeira_carga.set()
+            self._parar.wait(espera)
+
+    def obter(self, timeout: Optional[float] = None) -> Tuple[Any, int]:
+        """
+        Retorna (dados, versao) do último snapshot bom, lidos da mesma tupla, para que o
+        que for derivado dos dados seja chaveado pela versão deles. Só bloqueia enquanto
+        a primeira carga do processo não termina.
+
+        Raises:
+            RuntimeError: se nenhuma carga foi concluída com sucesso
+        """
+        self.iniciar()
+        self._primeira_carga.wait(timeout)
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError(f"Dados '{self.nome}' indisponíveis: {self.ultimo_erro or 'carga em andamento'}")
+        return snapshot[0], snapshot[2]
+
+    def status(self) -> Dict[str, Any]:
+        """Versão, horário da última troca e último erro do snapshot."""
+        snapshot = self._snapshot
+        return {
+            "versao": snapshot[2] if snapshot else 0,
+            "carregado_em": snapshot[1] if snapshot else None,
+            "proxima_atualizacao_em": snapshot[1] + self.intervalo if snapshot else None,
+            "ultimo_erro": self.ultimo_erro,
+        }
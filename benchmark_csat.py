@@ -0,0 +1,201 @@
+"""
+Benchmark da deduplicação de CSAT (deduplicar_csat)
+
+Compara as implementações anteriores (loop por grupo com drop do CSATProcessor
+e `.apply` + sort + drop_duplicates dos apps) com a deduplicação compartilhada,
+verificando que ela produz o mesmo resultado linha a linha que a regra do
+CSATProcessor. Antes de medir, roda uma bateria de casos aleatórios pequenos
+(códigos sem valor, avaliações vazias ou em minúsculas) checando as
+propriedades da regra, e confere que o CSATIncremental alimentado em lotes
+chega às mesmas métricas.
+
+Uso:
+    python benchmark_csat.py [--tamanhos 10000 100000 1000000] [--limite-legado 10000] [--lote 1000] [--casos 500]
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from csat_incremental import CSATIncremental
+from csat_processor import CSATProcessor, avaliacoes_positivas, deduplicar_csat
+
+COLUNA_CODIGO = "Código do Chamado"
+COLUNA_AVALIACAO = "Atendimento - CES e CSAT - [ANALISTA] Como você avalia a qualidade do atendimento prestado pelo analista neste chamado?"
+AVALIACOES = [
+    "Ótimo - Superou minhas expectativas",
+    "Bom - Atendeu minhas expectativas",
+    "Regular - Atendeu parcialmente",
+    "Ruim - Não atendeu minhas expectativas",
+    "Péssimo - Muito abaixo do esperado",
+]
+ANALISTAS = ["João Silva", "Maria Santos", "Pedro Oliveira", "Ana Costa",
+             "Carlos Ferreira", "Lucia Almeida", "Roberto Lima", "Fernanda Souza"]
+
+
+def gerar_pesquisas(num_registros: int, proporcao_duplicadas: float = 0.2, semente: int = 42) -> pd.DataFrame:
+    """
+    Gera respostas de pesquisa no formato da exportação, de forma vetorizada
+    (o csat_test_generator é quadrático e inviável para 1M de linhas).
+    """
+    rng = np.random.default_rng(semente)
+    num_codigos = max(1, int(num_registros * (1 - proporcao_duplicadas)))
+    codigos = np.concatenate([np.arange(num_codigos), rng.integers(0, num_codigos, num_registros - num_codigos)])
+    rng.shuffle(codigos)
+    return pd.DataFrame({
+        COLUNA_CODIGO: pd.Series(codigos).map("CH{:07d}".format),
+        "Analista Responsável": rng.choice(ANALISTAS, num_registros),
+        COLUNA_AVALIACAO: rng.choice(AVALIACOES, num_registros),
+    })
+
+
+def processar_legado(df: pd.DataFrame) -> dict:
+    """Deduplicação anterior do CSATProcessor (loop por grupo com drop), mantida como referência."""
+    df_processado = df.copy()
+    relatorio_deduplicacao = []
+    registros_removidos = 0
+    duplicatas = df_processado[df_processado.duplicated(subset=[COLUNA_CODIGO], keep=False)]
+    if not duplicatas.empty:
+        for codigo_chamado, grupo in duplicatas.groupby(COLUNA_CODIGO):
+            registros_validos = grupo[grupo[COLUNA_AVALIACAO].astype(str).str.lower().str.startswith(('bom', 'ótimo'))]
+            if not registros_validos.empty:
+                manter = registros_validos.iloc[0]
+                acao = 'Mantido Bom/Ótimo, removido duplicatas'
+            else:
+                manter = grupo.iloc[0]
+                acao = 'Mantido primeiro, removido duplicatas (sem Bom/Ótimo)'
+            remover = grupo.drop(manter.name)
+            df_processado = df_processado.drop(remover.index)
+            registros_removidos += len(remover)
+            relatorio_deduplicacao.append({
+                'codigo_chamado': codigo_chamado,
+                'acao': acao,
+                'mantido_index': manter.name,
+                'removido_indices': remover.index.tolist()
+            })
+    return {'dados_processados': df_processado, 'registros_removidos': registros_removidos,
+            'relatorio_deduplicacao': relatorio_deduplicacao}
+
+
+def processar_legado_apps(df: pd.DataFrame) -> pd.DataFrame:
+    """Deduplicação anterior dos apps (prioridade Ótimo > Bom via .apply), mantida como referência de custo."""
+    df = df.rename(columns={COLUNA_AVALIACAO: "Avaliacao_Qualidade"})
+    df["Avaliacao_Qualidade"] = df["Avaliacao_Qualidade"].astype(str)
+    df["prioridade_avaliacao"] = df["Avaliacao_Qualidade"].apply(
+        lambda x: 1 if x.startswith("Ótimo") else (2 if x.startswith("Bom") else 3)
+    )
+    df_sorted = df.sort_values(by=[COLUNA_CODIGO, "prioridade_avaliacao"])
+    return df_sorted.drop_duplicates(subset=COLUNA_CODIGO, keep="first").drop(columns=["prioridade_avaliacao"])
+
+
+def gerar_caso_aleatorio(rng: np.random.Generator) -> pd.DataFrame:
+    """Caso pequeno com muitas colisões de código, códigos e avaliações ausentes e variações de caixa."""
+    num_registros = int(rng.integers(0, 40))
+    num_codigos = int(rng.integers(1, 12))
+    avaliacoes = AVALIACOES + [avaliacao.lower() for avaliacao in AVALIACOES] + [None, ""]
+    codigos = pd.Series(rng.integers(0, num_codigos, num_registros)).map("CH{:03d}".format)
+    codigos[rng.random(num_registros) < 0.1] = None
+    return pd.DataFrame({
+        COLUNA_CODIGO: codigos.to_numpy(),
+        COLUNA_AVALIACAO: rng.choice(np.array(avaliacoes, dtype=object), num_registros),
+    }, index=rng.permutation(num_registros) * 10)
+
+
+def verificar_propriedades(num_casos: int, semente: int = 0) -> None:
+    """
+    Checa a deduplicação compartilhada em casos aleatórios contra a implementação
+    de referência e contra as propriedades da regra. Falha com AssertionError.
+    """
+    rng = np.random.default_rng(semente)
+    for caso in range(num_casos):
+        df = gerar_caso_aleatorio(rng)
+        mantido, relatorio = deduplicar_csat(df, COLUNA_CODIGO, COLUNA_AVALIACAO)
+        legado = processar_legado(df)
+        contexto = f"caso {caso}:\n{df}"
+
+        pd.testing.assert_frame_equal(legado['dados_processados'], mantido, obj=contexto)
+        assert legado['relatorio_deduplicacao'] == relatorio.to_list(), contexto
+        # Um registro por código; linhas sem código sempre mantidas; ordem original preservada
+        assert not mantido[COLUNA_CODIGO].dropna().duplicated().any(), contexto
+        assert mantido[COLUNA_CODIGO].isna().sum() == df[COLUNA_CODIGO].isna().sum(), contexto
+        assert df.index.get_indexer(mantido.index).tolist() == sorted(df.index.get_indexer(mantido.index)), contexto
+        # O mantido é Bom/Ótimo sempre que o código tiver alguma avaliação Bom/Ótimo
+        tem_positiva = pd.Series(avaliacoes_positivas(df[COLUNA_AVALIACAO]), index=df.index).groupby(df[COLUNA_CODIGO]).any()
+        positiva_mantida = pd.Series(avaliacoes_positivas(mantido[COLUNA_AVALIACAO]), index=mantido.index).groupby(mantido[COLUNA_CODIGO]).any()
+        pd.testing.assert_series_equal(tem_positiva, positiva_mantida, obj=contexto)
+        # Idempotente
+        pd.testing.assert_frame_equal(deduplicar_csat(mantido, COLUNA_CODIGO, COLUNA_AVALIACAO)[0], mantido, obj=contexto)
+
+
+def verificar_equivalencia(legado: dict, novo: dict) -> None:
+    """Falha com AssertionError se os dois resultados diferirem em qualquer linha."""
+    colunas_originais = legado['dados_processados'].columns
+    pd.testing.assert_frame_equal(legado['dados_processados'], novo['dados_processados'][colunas_originais])
+    assert legado['registros_removidos'] == novo['metricas']['registros_duplicados_removidos']
+    assert legado['relatorio_deduplicacao'] == novo['relatorio_deduplicacao'].to_list()
+
+
+def verificar_incremental(df: pd.DataFrame, tamanho_lote: int) -> float:
+    """
+    Aplica `df` em lotes no CSATIncremental e compara as métricas com o
+    processamento completo. Retorna o tempo médio por lote.
+    """
+    completo = CSATProcessor().processar_planilha_satisfacao_df(df)
+    incremental = CSATIncremental()
+    inicio = time.perf_counter()
+    for inicio_lote in range(0, len(df), tamanho_lote):
+        incremental.adicionar_lote(df.iloc[inicio_lote:inicio_lote + tamanho_lote])
+    tempo_por_lote = (time.perf_counter() - inicio) / -(-len(df) // tamanho_lote)
+
+    metricas = incremental.metricas()
+    for chave in ('total_registros_processados', 'registros_duplicados_removidos', 'csat_score', 'distribuicao_avaliacoes'):
+        assert metricas[chave] == completo['metricas'][chave], chave
+    por_analista = completo['dados_processados'].groupby("Analista Responsável").size().to_dict()
+    assert {analista: valores['total'] for analista, valores in metricas['por_analista'].items()} == por_analista
+    return tempo_por_lote
+
+
+def _cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--casos", type=int, default=500,
+                        help="quantidade de casos aleatórios na verificação de propriedades")
+    parser.add_argument("--lote", type=int, default=1_000,
+                        help="tamanho do lote na verificação do CSATIncremental")
+    parser.add_argument("--limite-legado", type=int, default=10_000,
+                        help="maior volume em que a implementação anterior também é medida")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    verificar_propriedades(args.casos)
+    print(f"{args.casos} casos aleatórios: deduplicação compartilhada equivalente à regra do CSATProcessor\n")
+
+    print(f"{'linhas':>10} {'legado proc. (s)':>17} {'legado apps (s)':>16} {'compartilhada (s)':>18} {'ganho apps':>11}")
+    for tamanho in args.tamanhos:
+        df = gerar_pesquisas(tamanho)
+        novo, tempo_novo = _cronometrar(CSATProcessor().processar_planilha_satisfacao_df, df)
+        _, tempo_apps = _cronometrar(processar_legado_apps, df)
+        _, tempo_compartilhada = _cronometrar(deduplicar_csat, df)
+        if tamanho <= args.limite_legado:
+            legado, tempo_legado = _cronometrar(processar_legado, df)
+            verificar_equivalencia(legado, novo)
+            coluna_legado = f"{tempo_legado:>17.3f}"
+        else:
+            coluna_legado = f"{'-':>17}"
+        print(f"{tamanho:>10} {coluna_legado} {tempo_apps:>16.3f} {tempo_compartilhada:>18.3f} {tempo_apps / tempo_compartilhada:>10.1f}x")
+
+    tamanho = min(args.tamanhos)
+    tempo_por_lote = verificar_incremental(gerar_pesquisas(tamanho), args.lote)
+    print(f"\nIncremental: {tamanho} linhas em lotes de {args.lote}, {tempo_por_lote * 1000:.1f} ms por lote (métricas iguais ao completo)")
+
+
+if __name__ == "__main__":
+    main()
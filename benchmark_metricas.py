@@ -0,0 +1,157 @@
+"""
+Benchmark da aba Metas Individuais (DataProcessor._calcular_metas_individuais)
+
+Compara a implementação anterior (um groupby por medida, DataFrames de
+preenchimento e cinco merges) com a agregação única, verificando que ambas
+produzem o mesmo resultado, e mede como cada uma escala com o número de
+chamados e com o número de analistas.
+
+Uso:
+    python benchmark_metricas.py [--linhas 10000 100000 1000000] [--analistas 10 100 1000]
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processor import DataProcessor
+from schema import aplicar_schema
+
+
+def gerar_chamados(num_linhas: int, num_analistas: int, semente: int = 42) -> pd.DataFrame:
+    """Relatório de Chamados sintético, já tipado pelo schema 'chamados'."""
+    rng = np.random.default_rng(semente)
+    datas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90 * 24 * 60, num_linhas), unit="min")
+    df = pd.DataFrame({
+        "Analista": pd.Series(rng.integers(0, num_analistas, num_linhas)).map("Analista {:04d}".format),
+        # Parte dos códigos se repete (vários registros por chamado)
+        "Código do Chamado": rng.integers(0, max(1, int(num_linhas * 0.8)), num_linhas),
+        "Data de Abertura": pd.Series(datas).where(rng.random(num_linhas) > 0.01),
+        "Tempo de Atendimento": rng.gamma(2.0, 20.0, num_linhas),
+        "SLA 1º Atendimento": rng.random(num_linhas),
+        "SLA Resolução": rng.random(num_linhas),
+    })
+    return aplicar_schema(df, "chamados")
+
+
+def gerar_csat(df_chamados: pd.DataFrame, semente: int = 7) -> pd.DataFrame:
+    """CSAT consolidado por analista no formato aceito pela aba (Analista, CSAT, Total Pesquisas, Respostas)."""
+    rng = np.random.default_rng(semente)
+    analistas = df_chamados["Analista"].cat.categories
+    # Um analista sem CSAT, para exercitar o alinhamento com valores ausentes
+    analistas = analistas[1:] if len(analistas) > 1 else analistas
+    num_linhas = len(analistas) * 5
+    total = rng.integers(1, 50, num_linhas)
+    return pd.DataFrame({
+        "Analista": np.repeat(analistas, 5),
+        "CSAT": rng.uniform(60, 100, num_linhas),
+        "Total Pesquisas": total,
+        "Respostas": rng.integers(0, total + 1),
+    })
+
+
+def calcular_legado(df_chamados: pd.DataFrame, df_csat_processado: pd.DataFrame) -> pd.DataFrame:
+    """Implementação anterior de _calcular_metas_individuais, mantida como referência."""
+    df_chamados = df_chamados.copy()
+    if 'Data de Abertura' in df_chamados.columns:
+        df_chamados['Data de Abertura'] = pd.to_datetime(df_chamados['Data de Abertura'], errors='coerce')
+        df_chamados = df_chamados.dropna(subset=['Data de Abertura'])
+
+    total_atendimentos = df_chamados.groupby('Analista', observed=True)['Código do Chamado'].nunique().reset_index()
+    total_atendimentos.columns = ['Analista', 'Total Atendimentos']
+
+    if 'Tempo de Atendimento' in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados['Tempo de Atendimento']):
+        media_atendimento = df_chamados.groupby('Analista', observed=True)['Tempo de Atendimento'].mean().reset_index()
+        media_atendimento.columns = ['Analista', 'Media Atendimento']
+    else:
+        media_atendimento = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'Media Atendimento': 'N/A'})
+
+    if not df_csat_processado.empty and 'Analista' in df_csat_processado.columns and 'CSAT' in df_csat_processado.columns:
+        csat_obtido = df_csat_processado.groupby('Analista', observed=True)['CSAT'].mean().reset_index()
+        csat_obtido.columns = ['Analista', 'CSAT Obtido']
+    else:
+        csat_obtido = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'CSAT Obtido': 'N/A'})
+
+    if not df_csat_processado.empty and 'Analista' in df_csat_processado.columns and 'Total Pesquisas' in df_csat_processado.columns and 'Respostas' in df_csat_processado.columns:
+        respostas_pesquisa = df_csat_processado.groupby('Analista', observed=True).agg(
+            Total_Pesquisas=('Total Pesquisas', 'sum'),
+            Respostas=('Respostas', 'sum')
+        ).reset_index()
+        respostas_pesquisa['Percentual_Resposta_Pesquisa'] = (respostas_pesquisa['Respostas'] / respostas_pesquisa['Total_Pesquisas']) * 100
+        respostas_pesquisa = respostas_pesquisa[['Analista', 'Percentual_Resposta_Pesquisa']]
+    else:
+        respostas_pesquisa = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'Percentual_Resposta_Pesquisa': 'N/A'})
+
+    if 'SLA 1º Atendimento' in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados['SLA 1º Atendimento']):
+        sla_primeiro = df_chamados.groupby('Analista', observed=True)['SLA 1º Atendimento'].mean().reset_index()
+        sla_primeiro.columns = ['Analista', 'SLA 1º Atendimento']
+    else:
+        sla_primeiro = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'SLA 1º Atendimento': 'N/A'})
+
+    if 'SLA Resolução' in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados['SLA Resolução']):
+        sla_resolucao = df_chamados.groupby('Analista', observed=True)['SLA Resolução'].mean().reset_index()
+        sla_resolucao.columns = ['Analista', 'SLA Resolução']
+    else:
+        sla_resolucao = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'SLA Resolução': 'N/A'})
+
+    df_metas = total_atendimentos.merge(media_atendimento, on='Analista', how='left')
+    df_metas = df_metas.merge(csat_obtido, on='Analista', how='left')
+    df_metas = df_metas.merge(respostas_pesquisa, on='Analista', how='left')
+    df_metas = df_metas.merge(sla_primeiro, on='Analista', how='left')
+    df_metas = df_metas.merge(sla_resolucao, on='Analista', how='left')
+    return df_metas
+
+
+def verificar_equivalencia(legado: pd.DataFrame, novo: pd.DataFrame) -> None:
+    """Falha com AssertionError se os resultados diferirem (tipos das colunas à parte)."""
+    pd.testing.assert_frame_equal(
+        legado.astype({'Analista': str}), novo.astype({'Analista': str}),
+        check_dtype=False, check_categorical=False
+    )
+
+
+def _cronometrar(funcao, *args, repeticoes: int = 3):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return resultado, melhor
+
+
+def _medir(num_linhas: int, num_analistas: int) -> None:
+    df_chamados = gerar_chamados(num_linhas, num_analistas)
+    df_csat = gerar_csat(df_chamados)
+    processor = DataProcessor()
+
+    def calcular_novo(df, df_csat_processado):
+        # Inclui a preparação dos chamados, que o legado fazia dentro do próprio cálculo
+        return processor._calcular_metas_individuais(processor._preparar_chamados(df)["com_data"], df_csat_processado)
+
+    legado, tempo_legado = _cronometrar(calcular_legado, df_chamados, df_csat)
+    novo, tempo_novo = _cronometrar(calcular_novo, df_chamados, df_csat)
+    verificar_equivalencia(legado, novo)
+    # Sem CSAT, as colunas correspondentes ficam 'N/A' nas duas implementações
+    verificar_equivalencia(calcular_legado(df_chamados, pd.DataFrame()), calcular_novo(df_chamados, pd.DataFrame()))
+    print(f"{num_linhas:>10} {num_analistas:>10} {tempo_legado:>12.4f} {tempo_novo:>14.4f} {tempo_legado / tempo_novo:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--analistas", type=int, nargs="+", default=[10, 100, 1_000])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'linhas':>10} {'analistas':>10} {'legado (s)':>12} {'agregação (s)':>14} {'ganho':>8}")
+    # Escala em linhas com o menor número de analistas, e em analistas com o maior volume
+    for num_linhas in args.linhas:
+        _medir(num_linhas, min(args.analistas))
+    for num_analistas in args.analistas[1:]:
+        _medir(max(args.linhas), num_analistas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Cache LRU, limitado em bytes, dos resultados calculados sobre uma seleção de filtros
+
+Cada interação com os widgets reexecuta o script do Streamlit; os resultados
+filtrados (chamados do período, médias diárias, cards) ficam guardados por
+(snapshot, filtro canônico) e são reaproveitados por qualquer sessão que
+peça a mesma seleção sobre o mesmo snapshot. Quando um snapshot mais novo
+aparece, os resultados dos anteriores são descartados: muitos deles são fatias
+do DataFrame do snapshot e o manteriam vivo, fora da conta do limite.
+"""
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Versões dos snapshots de que um resultado deriva (ex.: operacional, CSAT)
+Versao = Tuple[int, ...]
+
+
+def tamanho_em_bytes(valor: Any) -> int:
+    """Estimativa da memória ocupada por um resultado (DataFrames e arrays pelo conteúdo)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(k) + tamanho_em_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """
+    LRU de chave -> resultado, com o total estimado em bytes limitado a `max_bytes`.
+
+    Faltas concorrentes da mesma chave calculam o resultado uma única vez. Um
+    resultado maior que o limite inteiro é devolvido sem ser guardado. Os
+    resultados são compartilhados entre sessões e não devem ser alterados.
+
+    Resultados guardados com `versao` (as versões dos snapshots de que derivam)
+    valem só enquanto ela é a mais recente vista: uma versão maior em algum
+    componente descarta os anteriores, e quem ainda pede com uma versão antiga
+    recebe o resultado calculado sem que ele seja guardado.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = Config.CACHE_RESULTADOS_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[Hashable, Tuple[Any, int, Optional[Versao]]]" = OrderedDict()
+        self.versao: Optional[Versao] = None
+        self._single_flight = SingleFlight()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def obter(self, chave: Hashable, funcao: Callable[..., Any], *args,
+              versao: Optional[Versao] = None, **kwargs) -> Any:
+        """Resultado guardado para `chave`, ou `funcao(*args, **kwargs)` guardado a partir de agora."""
+        with self._lock:
+            if versao is not None:
+                self._atualizar_versao(versao)
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[0]
+            self.faltas += 1
+
+        valor = self._single_flight.executar(chave, funcao, *args, **kwargs)
+        self._guardar(chave, valor, versao)
+        return valor
+
+    def _atualizar_versao(self, versao: Versao) -> None:
+        """Adota o máximo, componente a componente, entre `versao` e a atual, descartando os resultados antigos."""
+        if self.versao is None:
+            self.versao = tuple(versao)
+            return
+        mais_recente = tuple(max(a, b) for a, b in zip(self.versao, versao))
+        if mais_recente == self.versao:
+            return
+        self.versao = mais_recente
+        antigas = [chave for chave, (_, _, versao_item) in self._itens.items()
+                   if versao_item is not None and versao_item != mais_recente]
+        for chave in antigas:
+            _, tamanho, _ = self._itens.pop(chave)
+            self.bytes -= tamanho
+            self.despejos += 1
+        logger.info(f"Snapshot {mais_recente} no cache de resultados; resultados de snapshots anteriores descartados.")
+
+    def _guardar(self, chave: Hashable, valor: Any, versao: Optional[Versao] = None) -> None:
+        tamanho = tamanho_em_bytes(valor)
+        if tamanho > self.max_bytes:
+            logger.info(f"Resultado de {tamanho / 1024 / 1024:.1f} MB maior que o cache; não guardado.")
+            return
+        with self._lock:
+            # Quem esperou por uma falha coalescida encontra o resultado já guardado
+            if chave in self._itens:
+                return
+            # Calculado sobre um snapshot que já foi substituído enquanto a função rodava
+            if versao is not None and tuple(versao) != self.versao:
+                return
+            self._itens[chave] = (valor, tamanho, versao)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, (_, tamanho_removido, _) = self._itens.popitem(last=False)
+                self.bytes -= tamanho_removido
+                self.despejos += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+            self.versao = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Acertos, faltas, despejos, ocupação e taxa de acerto do cache."""
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "itens": len(self._itens),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "versao": self.versao,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "despejos": self.despejos,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+
+_cache_resultados: Optional[CacheResultados] = None
+_cache_resultados_lock = threading.Lock()
+
+
+def obter_cache_resultados() -> CacheResultados:
+    """Retorna o CacheResultados compartilhado pelo processo."""
+    global _cache_resultados
+    with _cache_resultados_lock:
+        if _cache_resultados is None:
+            _cache_resultados = CacheResultados()
+        return _cache_resultados
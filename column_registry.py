@@ -0,0 +1,53 @@
+"""
+Registro das colunas que cada página ou métrica lê de cada relatório Eloca
+
+As páginas declaram suas colunas com `registrar_colunas`; os loaders passam a
+união delas como `usecols` para o `pd.read_excel`, de modo que o tempo de
+parse e a memória acompanhem as colunas usadas, e não a largura da exportação.
+"""
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set
+
+_requisitos: Dict[str, Dict[str, Set[str]]] = {}
+_lock = threading.Lock()
+
+
+def registrar_colunas(fonte: str, consumidor: str, colunas: Iterable[str]) -> None:
+    """
+    Declara as colunas de `fonte` lidas por `consumidor` (uma página ou métrica).
+    Registrar o mesmo consumidor de novo substitui a declaração anterior.
+    """
+    with _lock:
+        _requisitos.setdefault(fonte, {})[consumidor] = set(colunas)
+
+
+def colunas_necessarias(fonte: str) -> Optional[Set[str]]:
+    """Retorna a união das colunas declaradas para a fonte, ou None se nada foi declarado."""
+    with _lock:
+        consumidores = _requisitos.get(fonte)
+        if not consumidores:
+            return None
+        return set().union(*consumidores.values())
+
+
+def filtro_usecols(fonte: str) -> Optional[Callable[[str], bool]]:
+    """
+    Retorna um `usecols` para o `pd.read_excel` com as colunas necessárias da fonte.
+
+    É um callable, e não uma lista, para que colunas declaradas que não existam
+    na exportação sejam simplesmente ignoradas. Sem declarações, retorna None
+    (todas as colunas são lidas).
+    """
+    colunas = colunas_necessarias(fonte)
+    if colunas is None:
+        return None
+    return lambda coluna: coluna in colunas
+
+
+def assinatura_colunas(fonte: str) -> str:
+    """Identificador curto do conjunto de colunas da fonte, usado nas chaves de cache do parse."""
+    colunas = colunas_necessarias(fonte)
+    if colunas is None:
+        return "todas"
+    return hashlib.sha256("\x1f".join(sorted(colunas)).encode("utf-8")).hexdigest()[:12]
@@ -14,10 +14,38 @@ class Config:
     ELOCA_URL = os.getenv("ELOCA_URL", "")
     DESKMANAGER_TOKEN = os.getenv("DESKMANAGER_TOKEN", "")
     
+    # URLs dos relatórios baixados em paralelo pelo DataProcessor
+    URL_RELATORIO_CHAMADOS = os.getenv("URL_RELATORIO_CHAMADOS", ELOCA_URL)
+    URL_PESQUISA_SATISFACAO = os.getenv("URL_PESQUISA_SATISFACAO", os.getenv("CSAT_URL", ""))
+    
+    # Cliente HTTP da Eloca (pool de conexões, novas tentativas e timeouts)
+    ELOCA_POOL_SIZE = int(os.getenv("ELOCA_POOL_SIZE", "10"))
+    ELOCA_RETRIES = int(os.getenv("ELOCA_RETRIES", "3"))
+    ELOCA_BACKOFF_BASE = float(os.getenv("ELOCA_BACKOFF_BASE", "0.5"))  # segundos
+    ELOCA_BACKOFF_MAX = float(os.getenv("ELOCA_BACKOFF_MAX", "30"))  # segundos
+    ELOCA_CONNECT_TIMEOUT = float(os.getenv("ELOCA_CONNECT_TIMEOUT", "10"))  # segundos
+    ELOCA_READ_TIMEOUT = float(os.getenv("ELOCA_READ_TIMEOUT", "60"))  # segundos
+    
     # Configurações do App
     APP_TITLE = os.getenv("APP_TITLE", "Dashboard Eloca - Gestão de Vendas")
     CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))  # 1 hora em segundos
+    REFRESH_LEAD_TIME = int(os.getenv("REFRESH_LEAD_TIME", "120"))  # atualizar 2 min antes do TTL expirar
+    REFRESH_RETRY_INTERVAL = int(os.getenv("REFRESH_RETRY_INTERVAL", "60"))  # nova tentativa após falha
     DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
+    # Mescla cada exportação na base local de chamados em vez de substituí-la
+    INGESTAO_INCREMENTAL = os.getenv("INGESTAO_INCREMENTAL", "False").lower() == "true"
+    
+    # Diretórios de cache em disco
+    CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+    DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(CACHE_DIR, "downloads"))
+    TICKET_STORE_DIR = os.getenv("TICKET_STORE_DIR", os.path.join(CACHE_DIR, "tickets"))
+    TICKET_STORE_MAX_DELTAS = int(os.getenv("TICKET_STORE_MAX_DELTAS", "16"))  # deltas em disco antes de regravar a base
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(CACHE_DIR, "snapshots"))
+    SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", str(7 * 24 * 3600)))  # 7 dias em segundos
+    SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(512 * 1024 * 1024)))  # 512 MB
+    
+    # Cache em memória dos resultados filtrados (por snapshot, período e analistas)
+    CACHE_RESULTADOS_MAX_BYTES = int(os.getenv("CACHE_RESULTADOS_MAX_BYTES", str(256 * 1024 * 1024)))  # 256 MB
     
     # Headers para requisições
     HEADERS = {
@@ -34,6 +62,9 @@ class Config:
         "Grafico-Individual_2"
     ]
     
+    # Abas calculadas pelo DataProcessor (vazias quando o Relatório de Chamados não carrega)
+    ABAS_DASHBOARD = ABAS_PLANILHA
+    
     @classmethod
     def validate_config(cls):
         """Valida se as configurações essenciais estão definidas"""
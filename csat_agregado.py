@@ -0,0 +1,179 @@
+"""
+Agregado online de CSAT por (analista, dia)
+
+Guarda, em arrays compactos, a contagem de respostas por nota (0 = sem nota,
+1 a 5) e de respostas Bom/Ótimo para cada par (analista, dia). As telas de CSAT
+(gráfico diário, cards por analista, metas) são respondidas somando fatias
+desses arrays, sem merge nem groupby sobre as linhas de pesquisa.
+"""
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from csat_processor import COLUNA_NOTA, COLUNA_POSITIVA
+
+logger = logging.getLogger(__name__)
+
+NOTAS = np.arange(6)
+NOTAS_SATISFEITAS = [4, 5]
+
+
+class AgregadoCSAT:
+    """
+    Contadores de respostas por (analista, dia, nota) e de respostas positivas.
+
+    Analista ausente e dia ausente (NaT) têm posições próprias, para que os
+    totais gerais continuem batendo com as linhas de origem. Atualizações são
+    O(lote) e aceitam `sinal=-1` para retirar respostas substituídas.
+    """
+
+    def __init__(self, capacidade_analistas: int = 16, capacidade_dias: int = 64):
+        self._lock = threading.Lock()
+        self._analistas: Dict[Any, int] = {}
+        self._dias: Dict[Any, int] = {}
+        self._datas = np.full(capacidade_dias, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.contagem_notas = np.zeros((capacidade_analistas, capacidade_dias, len(NOTAS)), dtype=np.int32)
+        self.positivas = np.zeros((capacidade_analistas, capacidade_dias), dtype=np.int32)
+
+    @classmethod
+    def a_partir_de(cls, df: pd.DataFrame, coluna_analista: str, coluna_data: str) -> "AgregadoCSAT":
+        """Constrói o agregado a partir de um DataFrame com as colunas 'Nota' e 'Avaliacao_Positiva'."""
+        agregado = cls()
+        if not df.empty:
+            agregado.adicionar(df[coluna_analista], df[coluna_data], df[COLUNA_NOTA], df[COLUNA_POSITIVA])
+        return agregado
+
+    def copia(self) -> "AgregadoCSAT":
+        """Cópia independente dos contadores, para atualizar sem alterar o agregado já publicado."""
+        agregado = AgregadoCSAT()
+        with self._lock:
+            agregado._analistas = dict(self._analistas)
+            agregado._dias = dict(self._dias)
+            agregado._datas = self._datas.copy()
+            agregado.contagem_notas = self.contagem_notas.copy()
+            agregado.positivas = self.positivas.copy()
+        return agregado
+
+    @property
+    def analistas(self) -> list:
+        return [analista for analista in self._analistas if analista is not None]
+
+    def _posicoes(self, chaves: pd.Series, indice: Dict[Any, int]) -> np.ndarray:
+        # Só os valores distintos passam pelo dicionário; as linhas usam os códigos do factorize
+        codigos, valores = pd.factorize(chaves, use_na_sentinel=False)
+        posicoes = np.empty(len(valores), dtype=np.int64)
+        for i, valor in enumerate(valores):
+            chave = None if pd.isna(valor) else valor
+            if chave not in indice:
+                indice[chave] = len(indice)
+            posicoes[i] = indice[chave]
+        return posicoes[codigos]
+
+    def _garantir_capacidade(self) -> None:
+        analistas, dias = self.positivas.shape
+        if len(self._analistas) <= analistas and len(self._dias) <= dias:
+            return
+        # Crescimento geométrico, para que a ingestão em lotes pequenos continue O(lote) amortizado
+        novos_analistas = max(analistas * 2, len(self._analistas)) if len(self._analistas) > analistas else analistas
+        novos_dias = max(dias * 2, len(self._dias)) if len(self._dias) > dias else dias
+        contagem = np.zeros((novos_analistas, novos_dias, len(NOTAS)), dtype=np.int32)
+        contagem[:analistas, :dias] = self.contagem_notas
+        positivas = np.zeros((novos_analistas, novos_dias), dtype=np.int32)
+        positivas[:analistas, :dias] = self.positivas
+        datas = np.full(novos_dias, np.datetime64("NaT"), dtype="datetime64[ns]")
+        datas[:dias] = self._datas
+        self.contagem_notas, self.positivas, self._datas = contagem, positivas, datas
+
+    def adicionar(self, analistas: Iterable, datas: Iterable, notas: Iterable, positivas: Iterable,
+                  sinal: int = 1) -> None:
+        """Soma (ou, com `sinal=-1`, subtrai) um lote de respostas dos contadores."""
+        dias = pd.to_datetime(pd.Series(datas), errors="coerce").dt.normalize()
+        if dias.empty:
+            return
+        notas = pd.Series(notas, dtype="Int8").fillna(0).to_numpy(dtype=np.int64)
+        positivas = np.asarray(positivas, dtype=bool)
+        with self._lock:
+            linhas = self._posicoes(pd.Series(analistas), self._analistas)
+            colunas = self._posicoes(dias, self._dias)
+            self._garantir_capacidade()
+            self._datas[colunas] = dias.to_numpy(dtype="datetime64[ns]")
+            np.add.at(self.contagem_notas, (linhas, colunas, notas), sinal)
+            np.add.at(self.positivas, (linhas, colunas), sinal * positivas)
+
+    def _fatia(self, analistas: Optional[Iterable], inicio, fim, incluir_sem_data: bool):
+        if analistas is None:
+            linhas = np.arange(len(self._analistas))
+        else:
+            linhas = np.array([self._analistas[a] for a in analistas if a in self._analistas], dtype=np.int64)
+        datas = self._datas[:len(self._dias)]
+        mascara = np.ones(len(datas), dtype=bool) if incluir_sem_data else ~np.isnat(datas)
+        if inicio is not None:
+            mascara &= datas >= pd.Timestamp(inicio).to_datetime64()
+        if fim is not None:
+            mascara &= datas <= pd.Timestamp(fim).to_datetime64()
+        colunas = np.flatnonzero(mascara)
+        return self.contagem_notas[np.ix_(linhas, colunas)], self.positivas[np.ix_(linhas, colunas)], linhas, colunas
+
+    @staticmethod
+    def _metricas(contagem: np.ndarray, positivas: np.ndarray) -> Dict[str, np.ndarray]:
+        # contagem: (..., 6) por nota; positivas: (...)
+        respostas = contagem.sum(axis=-1)
+        com_nota = respostas - contagem[..., 0]
+        satisfeitos = contagem[..., NOTAS_SATISFEITAS].sum(axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "Respostas": respostas,
+                "Com_Nota": com_nota,
+                "Media_Nota": np.where(com_nota > 0, (contagem @ NOTAS) / com_nota, np.nan),
+                "Satisfeitos": satisfeitos,
+                "Percentual_Satisfeitos": np.where(respostas > 0, satisfeitos / respostas * 100, 0.0),
+                "Positivas": positivas,
+            }
+
+    def resumo(self, analistas: Optional[Iterable] = None, inicio=None, fim=None,
+               incluir_sem_data: bool = False) -> Dict[str, Any]:
+        """Totais da seleção: respostas, média das notas, satisfeitos (notas 4 e 5) e distribuição por nota."""
+        with self._lock:
+            contagem, positivas, _, _ = self._fatia(analistas, inicio, fim, incluir_sem_data)
+            por_nota = contagem.sum(axis=(0, 1))
+            total_positivas = int(positivas.sum())
+        metricas = self._metricas(por_nota, np.asarray(total_positivas))
+        return {
+            "respostas": int(metricas["Respostas"]),
+            "com_nota": int(metricas["Com_Nota"]),
+            "media_nota": float(metricas["Media_Nota"]),
+            "satisfeitos": int(metricas["Satisfeitos"]),
+            "percentual_satisfeitos": float(metricas["Percentual_Satisfeitos"]),
+            "positivas": total_positivas,
+            # Nota -> quantidade, só para as notas presentes
+            "distribuicao_notas": {int(nota): int(quantidade) for nota, quantidade in enumerate(por_nota) if nota and quantidade},
+        }
+
+    @staticmethod
+    def _tabela(metricas: Dict[str, np.ndarray], rotulos: np.ndarray, nome: str, ordem: np.ndarray) -> pd.DataFrame:
+        # Filtra e ordena ainda em numpy; o DataFrame é montado uma única vez, já no formato final
+        selecionadas = ordem[metricas["Respostas"][ordem] > 0]
+        return pd.DataFrame({coluna: valores[selecionadas] for coluna, valores in metricas.items()},
+                            index=pd.Index(rotulos[selecionadas], name=nome))
+
+    def por_dia(self, analistas: Optional[Iterable] = None, inicio=None, fim=None) -> pd.DataFrame:
+        """Métricas por dia (ordenado), somando os analistas selecionados."""
+        with self._lock:
+            contagem, positivas, _, colunas = self._fatia(analistas, inicio, fim, incluir_sem_data=False)
+            metricas = self._metricas(contagem.sum(axis=0), positivas.sum(axis=0))
+            datas = self._datas[colunas]
+        return self._tabela(metricas, datas, "Dia", np.argsort(datas, kind="stable"))
+
+    def por_analista(self, analistas: Optional[Iterable] = None, inicio=None, fim=None,
+                     incluir_sem_data: bool = False) -> pd.DataFrame:
+        """Métricas por analista, somando os dias selecionados. Respostas sem analista ficam de fora."""
+        with self._lock:
+            contagem, positivas, linhas, _ = self._fatia(analistas, inicio, fim, incluir_sem_data)
+            metricas = self._metricas(contagem.sum(axis=1), positivas.sum(axis=1))
+            nomes = {posicao: analista for analista, posicao in self._analistas.items()}
+        rotulos = np.array([nomes[linha] for linha in linhas], dtype=object)
+        ordem = sorted((i for i, analista in enumerate(rotulos) if analista is not None), key=lambda i: str(rotulos[i]))
+        return self._tabela(metricas, rotulos, "Analista", np.array(ordem, dtype=np.int64))
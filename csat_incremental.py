@@ -0,0 +1,216 @@
+"""
+Estado incremental do CSAT indexado por 'Código do Chamado'
+
+Em vez de desduplicar e recalcular as métricas sobre todo o histórico a cada
+nova exportação da pesquisa, mantém um índice código -> resposta retida e
+contadores agregados. Cada lote de respostas novas é aplicado em O(lote), com
+a mesma regra do CSATProcessor: fica a primeira avaliação Bom/Ótimo do código
+ou, se não houver, a primeira resposta recebida.
+
+O DataProcessor mantém um estado por processo (obter_csat_incremental) e o
+sincroniza com cada exportação completa da pesquisa: só as linhas acrescentadas
+desde a exportação anterior são aplicadas como lote.
+"""
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from csat_agregado import AgregadoCSAT
+from csat_processor import COLUNA_NOTA, COLUNA_POSITIVA, CSATProcessor, codificar_avaliacoes
+from schema import COLUNA_AVALIACAO_CSAT
+
+logger = logging.getLogger(__name__)
+
+
+class CSATIncremental:
+    """
+    Índice das respostas retidas por código de chamado, com os contadores de
+    CSAT geral, distribuição das avaliações e totais por analista.
+
+    Respostas sem código não são deduplicadas (como no CSATProcessor): entram
+    nos contadores, mas não no índice.
+
+    Se `agregado` for informado, cada lote também atualiza o AgregadoCSAT por
+    (analista, dia de `coluna_data`), retirando as respostas substituídas; se
+    sincronizar precisar reconstruir o estado, o agregado é trocado por um novo.
+    """
+
+    def __init__(self, coluna_codigo: str = "Código do Chamado", coluna_avaliacao: str = COLUNA_AVALIACAO_CSAT,
+                 coluna_analista: str = "Analista Responsável", coluna_data: str = "Data da Pesquisa",
+                 agregado: Optional[AgregadoCSAT] = None):
+        self.coluna_codigo = coluna_codigo
+        self.coluna_avaliacao = coluna_avaliacao
+        self.coluna_analista = coluna_analista
+        self.coluna_data = coluna_data
+        self.agregado = agregado
+        self._lock = threading.Lock()
+        self._lock_sincronizacao = threading.Lock()
+        self._resetar()
+
+    def _resetar(self) -> None:
+        # código -> (positiva, avaliação, analista, nota, data) da resposta retida
+        self._retidas: Dict[Any, Tuple[bool, Any, Any, Any, Any]] = {}
+        self.total_recebidas = 0
+        self.total = 0
+        self.positivas = 0
+        self.distribuicao: Counter = Counter()
+        # analista -> [total, positivas]
+        self.por_analista: Dict[Any, list] = {}
+        # Respostas do lote corrente a somar (1) ou retirar (-1) do agregado
+        self._pendentes_agregado: Dict[int, list] = {1: [], -1: []}
+        # Hash de cada linha já aplicada por sincronizar, na ordem da exportação
+        self._hashes = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __contains__(self, codigo: Any) -> bool:
+        return codigo in self._retidas
+
+    def _contar(self, positiva: bool, avaliacao: Any, analista: Any, nota: Any, data: Any, sinal: int) -> None:
+        analista = None if pd.isna(analista) else analista
+        self.total += sinal
+        self.positivas += sinal * positiva
+        if not pd.isna(avaliacao):
+            self.distribuicao[avaliacao] += sinal
+            if self.distribuicao[avaliacao] <= 0:
+                del self.distribuicao[avaliacao]
+        contadores = self.por_analista.setdefault(analista, [0, 0])
+        contadores[0] += sinal
+        contadores[1] += sinal * positiva
+        if contadores[0] <= 0:
+            del self.por_analista[analista]
+        if self.agregado is not None:
+            self._pendentes_agregado[sinal].append((analista, data, nota, positiva))
+
+    def adicionar_lote(self, df_lote: pd.DataFrame) -> Dict[str, int]:
+        """
+        Aplica um lote de respostas novas ao estado, na ordem em que chegaram.
+
+        Returns:
+            Dict com 'recebidas', 'inseridas', 'substituidas' e 'descartadas'
+        """
+        resultado = {"recebidas": len(df_lote), "inseridas": 0, "substituidas": 0, "descartadas": 0}
+        if df_lote.empty:
+            return resultado
+        if self.coluna_codigo not in df_lote.columns or self.coluna_avaliacao not in df_lote.columns:
+            raise KeyError(f"Colunas essenciais não encontradas: {self.coluna_codigo}, {self.coluna_avaliacao}")
+
+        # Desduplica o lote primeiro, para que o índice receba no máximo uma resposta por código
+        codigos = df_lote[self.coluna_codigo]
+        if COLUNA_POSITIVA in df_lote.columns and COLUNA_NOTA in df_lote.columns:
+            codificadas = df_lote[[COLUNA_NOTA, COLUNA_POSITIVA]]
+        else:
+            codificadas = codificar_avaliacoes(df_lote[self.coluna_avaliacao])
+        positivas = codificadas[COLUNA_POSITIVA].to_numpy(dtype=bool)
+        manter, _ = CSATProcessor._deduplicar(codigos, positivas, df_lote.index)
+        ausente = pd.Series(None, index=df_lote.index, dtype=object)
+        analistas = df_lote[self.coluna_analista] if self.coluna_analista in df_lote.columns else ausente
+        datas = df_lote[self.coluna_data] if self.coluna_data in df_lote.columns else ausente
+        resultado["descartadas"] = int(len(df_lote) - manter.sum())
+
+        with self._lock:
+            self.total_recebidas += len(df_lote)
+            self._pendentes_agregado = {1: [], -1: []}
+            for codigo, positiva, avaliacao, analista, nota, data in zip(
+                codigos.to_numpy()[manter], positivas[manter].tolist(),
+                df_lote[self.coluna_avaliacao].to_numpy()[manter], analistas.to_numpy()[manter],
+                codificadas[COLUNA_NOTA].to_numpy(dtype=object)[manter], datas.to_numpy()[manter]
+            ):
+                if pd.isna(codigo):
+                    self._contar(positiva, avaliacao, analista, nota, data, 1)
+                    resultado["inseridas"] += 1
+                    continue
+                anterior = self._retidas.get(codigo)
+                if anterior is None:
+                    resultado["inseridas"] += 1
+                elif positiva and not anterior[0]:
+                    # Primeira Bom/Ótimo do código substitui a resposta retida sem Bom/Ótimo
+                    self._contar(*anterior, -1)
+                    resultado["substituidas"] += 1
+                else:
+                    resultado["descartadas"] += 1
+                    continue
+                self._retidas[codigo] = (positiva, avaliacao, analista, nota, data)
+                self._contar(positiva, avaliacao, analista, nota, data, 1)
+
+            # O agregado por (analista, dia) recebe o lote inteiro de uma vez: retiradas e inclusões
+            for sinal, respostas in self._pendentes_agregado.items():
+                if respostas:
+                    self.agregado.adicionar(*zip(*respostas), sinal=sinal)
+
+        logger.info(
+            f"Lote de CSAT aplicado: {resultado['inseridas']} inseridas, {resultado['substituidas']} substituídas, "
+            f"{resultado['descartadas']} descartadas. CSAT Score: {self.csat_score():.2f}%"
+        )
+        return resultado
+
+    def sincronizar(self, df_exportacao: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Aplica ao estado uma nova exportação completa da pesquisa.
+
+        As exportações crescem por acréscimo no fim: se esta começa pelas mesmas linhas
+        já aplicadas (comparadas por hash), só as seguintes entram como lote. Se alguma
+        linha aplicada mudou, saiu ou trocou de posição, a regra da primeira resposta
+        não pode ser refeita por lote e o estado é reconstruído da exportação inteira.
+
+        Returns:
+            metricas() após a sincronização, com 'lote' (resultado do adicionar_lote)
+            e 'reconstruido'
+        """
+        hashes = pd.util.hash_pandas_object(df_exportacao, index=False).to_numpy()
+        with self._lock_sincronizacao:
+            aplicadas = len(self._hashes)
+            reconstruido = not (len(hashes) >= aplicadas and np.array_equal(hashes[:aplicadas], self._hashes))
+            if reconstruido:
+                with self._lock:
+                    self._resetar()
+                    if self.agregado is not None:
+                        self.agregado = AgregadoCSAT()
+                aplicadas = 0
+            lote = self.adicionar_lote(df_exportacao.iloc[aplicadas:])
+            self._hashes = hashes
+            metricas = self.metricas()
+        if reconstruido:
+            logger.info(f"Estado do CSAT reconstruído a partir de {len(df_exportacao)} respostas.")
+        return {**metricas, 'lote': lote, 'reconstruido': reconstruido}
+
+    def csat_score(self, analista: Optional[Any] = None) -> float:
+        """Percentual de respostas Bom/Ótimo entre as retidas (geral ou de um analista)."""
+        if analista is None:
+            total, positivas = self.total, self.positivas
+        else:
+            total, positivas = self.por_analista.get(analista, (0, 0))
+        return positivas / total * 100 if total else 0.0
+
+    def metricas(self) -> Dict[str, Any]:
+        """Métricas no mesmo formato de CSATProcessor, mais os contadores por analista."""
+        with self._lock:
+            return {
+                'total_registros_originais': self.total_recebidas,
+                'total_registros_processados': self.total,
+                'registros_duplicados_removidos': self.total_recebidas - self.total,
+                'csat_score': round(self.csat_score(), 2),
+                'distribuicao_avaliacoes': dict(self.distribuicao),
+                'por_analista': {
+                    analista: {'total': total, 'positivas': positivas,
+                               'csat_score': round(positivas / total * 100, 2)}
+                    for analista, (total, positivas) in self.por_analista.items()
+                },
+            }
+
+
+_estados: Dict[str, CSATIncremental] = {}
+_estados_lock = threading.Lock()
+
+
+def obter_csat_incremental(nome: str) -> CSATIncremental:
+    """Retorna o CSATIncremental compartilhado pelo processo para a pesquisa `nome`."""
+    with _estados_lock:
+        if nome not in _estados:
+            _estados[nome] = CSATIncremental()
+        return _estados[nome]
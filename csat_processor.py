@@ -1,8 +1,125 @@
+import numpy as np
 import pandas as pd
 import logging
+from typing import List, Tuple
+
+from schema import COLUNA_AVALIACAO_CSAT, definicao_coluna
 
 logger = logging.getLogger(__name__)
 
+COLUNA_CODIGO_CHAMADO = "Código do Chamado"
+# Colunas compactas derivadas do texto da avaliação (ver codificar_avaliacoes)
+COLUNA_NOTA = "Nota"
+COLUNA_POSITIVA = "Avaliacao_Positiva"
+NOTAS_POR_AVALIACAO = {'ótimo': 5, 'bom': 4, 'regular': 3, 'ruim': 2, 'péssimo': 1}
+
+# Demais perguntas da exportação da pesquisa, usadas na pontuação em lote
+COLUNA_ANALISTA_PESQUISA = "Analista Responsável"
+COLUNA_DATA_PESQUISA = "Data da Pesquisa"
+COLUNA_NPS = "Score NPS"
+NPS_PROMOTOR_MINIMO = 9
+NPS_NEUTRO_MINIMO = 7
+
+# Códigos de motivo do relatório de deduplicação
+MOTIVO_BOM_OTIMO = 0
+MOTIVO_PRIMEIRO = 1
+ACOES = {
+    MOTIVO_BOM_OTIMO: 'Mantido Bom/Ótimo, removido duplicatas',
+    MOTIVO_PRIMEIRO: 'Mantido primeiro, removido duplicatas (sem Bom/Ótimo)',
+}
+
+
+def _codificar_texto(texto: str) -> Tuple[int, bool]:
+    """Nota (0 se não identificada) e indicador Bom/Ótimo de um texto de avaliação."""
+    minusculo = texto.lower()
+    if minusculo[:1].isdigit():
+        nota = int(minusculo[0])
+    else:
+        nota = next((valor for prefixo, valor in NOTAS_POR_AVALIACAO.items() if minusculo.startswith(prefixo)), 0)
+    return nota, minusculo.startswith(('bom', 'ótimo'))
+
+
+def codificar_avaliacoes(avaliacoes: pd.Series) -> pd.DataFrame:
+    """
+    Codifica os textos de avaliação em 'Nota' (Int8, 1 a 5) e 'Avaliacao_Positiva' (bool).
+
+    Cada texto distinto é interpretado uma única vez (são poucos) e o resultado é
+    espalhado pelas linhas via os códigos categóricos, sem trabalho de string por linha.
+    A nota vem do dígito inicial do texto ou, na falta dele, da palavra inicial
+    (Ótimo=5 ... Péssimo=1); textos sem nota identificável ficam como NA.
+    """
+    categorias = avaliacoes if isinstance(avaliacoes.dtype, pd.CategoricalDtype) else avaliacoes.astype('category')
+    codificados = [_codificar_texto(str(texto)) for texto in categorias.cat.categories]
+    # Uma posição extra ao final para o código -1 (avaliação ausente)
+    notas = np.array([nota for nota, _ in codificados] + [0], dtype=np.int8)
+    positivas = np.array([positiva for _, positiva in codificados] + [False], dtype=bool)
+    codigos = categorias.cat.codes.to_numpy()
+    nota = notas[codigos]
+    return pd.DataFrame({
+        COLUNA_NOTA: pd.arrays.IntegerArray(nota, nota == 0),
+        COLUNA_POSITIVA: positivas[codigos],
+    }, index=avaliacoes.index)
+
+
+def avaliacoes_positivas(avaliacoes: pd.Series) -> np.ndarray:
+    """Máscara booleana das avaliações Bom/Ótimo (as que têm prioridade na deduplicação)."""
+    return codificar_avaliacoes(avaliacoes)[COLUNA_POSITIVA].to_numpy()
+
+
+class RelatorioDeduplicacao:
+    """
+    Trilha de auditoria da deduplicação guardada como arrays compactos: para cada
+    código duplicado, a posição mantida, um código de motivo e o intervalo das
+    posições removidas. Os dicionários (ou o DataFrame) só são montados quando
+    alguém de fato abre o relatório.
+
+    Iterar produz os mesmos dicionários do formato anterior ('codigo_chamado',
+    'acao', 'mantido_index', 'removido_indices').
+    """
+
+    def __init__(self, codigos=None, mantidas=None, removidas=None, inicio_removidas=None, motivos=None, indice=None):
+        vazio = np.array([], dtype=np.int64)
+        self.codigos = codigos if codigos is not None else vazio
+        self.mantidas = mantidas if mantidas is not None else vazio
+        self.removidas = removidas if removidas is not None else vazio
+        self.inicio_removidas = inicio_removidas if inicio_removidas is not None else vazio
+        self.motivos = motivos if motivos is not None else vazio.astype(np.int8)
+        self.indice = indice if indice is not None else pd.RangeIndex(0)
+
+    def __len__(self) -> int:
+        return len(self.mantidas)
+
+    def __getitem__(self, posicao: int) -> dict:
+        if not -len(self) <= posicao < len(self):
+            raise IndexError(posicao)
+        posicao %= len(self)
+        fim = self.inicio_removidas[posicao + 1] if posicao + 1 < len(self) else len(self.removidas)
+        return {
+            'codigo_chamado': self.codigos[posicao],
+            'acao': ACOES[int(self.motivos[posicao])],
+            'mantido_index': self.indice[self.mantidas[posicao]],
+            'removido_indices': self.indice[self.removidas[self.inicio_removidas[posicao]:fim]].tolist()
+        }
+
+    def __iter__(self):
+        for posicao in range(len(self)):
+            yield self[posicao]
+
+    def to_list(self) -> List[dict]:
+        """Materializa o relatório como lista de dicionários (um por código duplicado)."""
+        return list(self)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Materializa o relatório com uma linha por registro removido."""
+        tamanhos = np.diff(np.append(self.inicio_removidas, len(self.removidas)))
+        return pd.DataFrame({
+            'codigo_chamado': np.repeat(np.asarray(self.codigos, dtype=object), tamanhos),
+            'acao': pd.Categorical.from_codes(np.repeat(self.motivos, tamanhos), categories=list(ACOES.values())),
+            'mantido_index': self.indice[np.repeat(self.mantidas, tamanhos)],
+            'removido_index': self.indice[self.removidas],
+        })
+
+
 class CSATProcessor:
     """Processador de dados de CSAT com regras de deduplicação."""
 
@@ -25,67 +142,39 @@ class CSATProcessor:
                 'sucesso': True,
                 'dados_processados': pd.DataFrame(),
                 'metricas': {'total_registros': 0, 'registros_duplicados_removidos': 0, 'csat_score': 0.0},
-                'relatorio_deduplicacao': []
+                'relatorio_deduplicacao': RelatorioDeduplicacao()
             }
 
-        df_processado = df.copy()
-        relatorio_deduplicacao = []
-        registros_removidos = 0
-
         # Colunas relevantes
-        col_codigo_chamado = "Código do Chamado"
-        col_avaliacao = "Atendimento - CES e CSAT - [ANALISTA] Como você avalia a qualidade do atendimento prestado pelo analista neste chamado?"
+        col_codigo_chamado = COLUNA_CODIGO_CHAMADO
+        col_avaliacao = COLUNA_AVALIACAO_CSAT
 
-        if col_codigo_chamado not in df_processado.columns or col_avaliacao not in df_processado.columns:
+        if col_codigo_chamado not in df.columns or col_avaliacao not in df.columns:
             logger.error(f"Colunas '{col_codigo_chamado}' ou '{col_avaliacao}' não encontradas no DataFrame de CSAT.")
             return {
                 'sucesso': False,
                 'erro': f"Colunas essenciais não encontradas: {col_codigo_chamado}, {col_avaliacao}"
             }
 
-        # Identificar duplicatas com base no 'Código do Chamado'
-        duplicatas = df_processado[df_processado.duplicated(subset=[col_codigo_chamado], keep=False)]
-
-        if not duplicatas.empty:
-            for codigo_chamado, grupo in duplicatas.groupby(col_codigo_chamado):
-                registros_validos = grupo[grupo[col_avaliacao].astype(str).str.lower().str.startswith(('bom', 'ótimo'))]
-
-                if not registros_validos.empty:
-                    # Se houver registros 'Bom' ou 'Ótimo', manter apenas o primeiro válido
-                    manter = registros_validos.iloc[0]
-                    remover = grupo.drop(manter.name)
-                    df_processado = df_processado.drop(remover.index)
-                    registros_removidos += len(remover)
-                    relatorio_deduplicacao.append({
-                        'codigo_chamado': codigo_chamado,
-                        'acao': 'Mantido Bom/Ótimo, removido duplicatas',
-                        'mantido_index': manter.name,
-                        'removido_indices': remover.index.tolist()
-                    })
-                else:
-                    # Se não houver 'Bom' ou 'Ótimo', manter apenas o primeiro registro do grupo
-                    manter = grupo.iloc[0]
-                    remover = grupo.drop(manter.name)
-                    df_processado = df_processado.drop(remover.index)
-                    registros_removidos += len(remover)
-                    relatorio_deduplicacao.append({
-                        'codigo_chamado': codigo_chamado,
-                        'acao': 'Mantido primeiro, removido duplicatas (sem Bom/Ótimo)',
-                        'mantido_index': manter.name,
-                        'removido_indices': remover.index.tolist()
-                    })
+        # Nota e indicador Bom/Ótimo calculados uma vez por texto distinto
+        df_processado = df.assign(**codificar_avaliacoes(df[col_avaliacao]))
+
+        # Deduplicação por 'Código do Chamado' (regra compartilhada com os apps)
+        df_processado, relatorio_deduplicacao = deduplicar_csat(df_processado, col_codigo_chamado, col_avaliacao)
+        registros_removidos = len(df) - len(df_processado)
 
         # Calcular métricas CSAT
         total_avaliacoes = len(df_processado)
-        avaliacoes_positivas = df_processado[df_processado[col_avaliacao].astype(str).str.lower().str.startswith(('bom', 'ótimo'))]
-        csat_score = (len(avaliacoes_positivas) / total_avaliacoes * 100) if total_avaliacoes > 0 else 0.0
+        total_positivas = int(df_processado[COLUNA_POSITIVA].sum())
+        csat_score = (total_positivas / total_avaliacoes * 100) if total_avaliacoes > 0 else 0.0
 
         metricas = {
             'total_registros_originais': len(df),
             'total_registros_processados': len(df_processado),
             'registros_duplicados_removidos': registros_removidos,
             'csat_score': round(csat_score, 2),
-            'distribuicao_avaliacoes': df_processado[col_avaliacao].value_counts().to_dict()
+            # Categorias sem ocorrências (coluna categórica) ficam fora da distribuição
+            'distribuicao_avaliacoes': df_processado[col_avaliacao].value_counts().loc[lambda contagem: contagem > 0].to_dict()
         }
 
         logger.info(f"Processamento CSAT concluído. Registros removidos: {registros_removidos}, CSAT Score: {csat_score:.2f}%")
@@ -94,9 +183,143 @@ class CSATProcessor:
             'sucesso': True,
             'dados_processados': df_processado,
             'metricas': metricas,
-            'relatorio_deduplicacao': relatorio_deduplicacao
+            'relatorio_deduplicacao': relatorio_deduplicacao,
+            'pontuacao': self.pontuar_pesquisas(df_processado)
         }
 
+    def pontuar_pesquisas(self, df: pd.DataFrame, coluna_analista: str = COLUNA_ANALISTA_PESQUISA,
+                          coluna_data: str = COLUNA_DATA_PESQUISA) -> dict:
+        """
+        Pontua CSAT, NPS e CES de uma vez sobre o DataFrame já desduplicado.
+
+        Cada pergunta vira contadores inteiros (respostas Bom/Ótimo, promotores,
+        neutros e detratores do 'Score NPS', e a distribuição 1-5 da pergunta
+        "CES e CSAT") somados numa única agregação por analista e por dia. Não
+        são criadas colunas derivadas por linha.
+
+        Returns:
+            Dicionário com 'geral' (totais e scores), 'por_analista' e 'por_dia' (DataFrames)
+        """
+        if df.empty:
+            return {'geral': {}, 'por_analista': pd.DataFrame(), 'por_dia': pd.DataFrame()}
+
+        if COLUNA_NOTA not in df.columns or COLUNA_POSITIVA not in df.columns:
+            df = df.assign(**codificar_avaliacoes(df[COLUNA_AVALIACAO_CSAT]))
+        notas = df[COLUNA_NOTA].fillna(0).to_numpy(dtype=np.int8)
+        if COLUNA_NPS in df.columns:
+            nps = pd.to_numeric(df[COLUNA_NPS], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+        else:
+            nps = np.full(len(df), np.nan, dtype=np.float32)
+
+        contadores = pd.DataFrame({
+            'Respostas': np.ones(len(df), dtype=np.int32),
+            'CSAT_Positivas': df[COLUNA_POSITIVA].to_numpy(dtype=bool),
+            **{f'CES_{nota}': notas == nota for nota in range(1, 6)},
+            'NPS_Respostas': ~np.isnan(nps),
+            'NPS_Promotores': nps >= NPS_PROMOTOR_MINIMO,
+            'NPS_Neutros': (nps >= NPS_NEUTRO_MINIMO) & (nps < NPS_PROMOTOR_MINIMO),
+            'NPS_Detratores': nps < NPS_NEUTRO_MINIMO,
+        })
+
+        ausente = pd.Series(np.nan, index=df.index)
+        analistas = df[coluna_analista] if coluna_analista in df.columns else ausente
+        datas = df[coluna_data] if coluna_data in df.columns else ausente
+        if not pd.api.types.is_datetime64_any_dtype(datas):
+            formato = (definicao_coluna("pesquisa_satisfacao", coluna_data) or {}).get('formato')
+            datas = pd.to_datetime(datas, format=formato, errors='coerce')
+
+        por_analista = contadores.groupby(analistas.to_numpy(), sort=True).sum()
+        por_dia = contadores.groupby(datas.dt.normalize().to_numpy(), sort=True).sum()
+        por_analista.index.name, por_dia.index.name = coluna_analista, 'Dia'
+        totais = self._scores(contadores.sum().to_frame().T)
+        geral = {coluna: totais[coluna].iloc[0].item() for coluna in totais.columns}
+        geral.update({score: round(geral[score], 2) for score in ('CSAT', 'NPS', 'CES_Media')})
+
+        logger.info(f"Pesquisas pontuadas: CSAT {geral['CSAT']:.2f}%, NPS {geral['NPS']:.1f}, CES médio {geral['CES_Media']:.2f}")
+        return {
+            'geral': geral,
+            'por_analista': self._scores(por_analista),
+            'por_dia': self._scores(por_dia),
+        }
+
+    @staticmethod
+    def _scores(contadores: pd.DataFrame) -> pd.DataFrame:
+        """Converte os contadores para int32 e acrescenta CSAT (%), NPS (-100 a 100) e CES médio (1-5)."""
+        contadores = contadores.astype(np.int32)
+        respostas_ces = contadores[[f'CES_{nota}' for nota in range(1, 6)]]
+        soma_ces = respostas_ces.to_numpy() @ np.arange(1, 6)
+        total_ces = respostas_ces.sum(axis=1).to_numpy()
+        total_nps = contadores['NPS_Respostas'].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return contadores.assign(
+                CSAT=(contadores['CSAT_Positivas'] / contadores['Respostas'] * 100).astype(np.float32),
+                NPS=np.where(total_nps > 0, (contadores['NPS_Promotores'] - contadores['NPS_Detratores']) / total_nps * 100, np.nan).astype(np.float32),
+                CES_Media=np.where(total_ces > 0, soma_ces / total_ces, np.nan).astype(np.float32),
+            )
+
+    @staticmethod
+    def _deduplicar(codigos: pd.Series, positivas: np.ndarray, indice: pd.Index) -> Tuple[np.ndarray, 'RelatorioDeduplicacao']:
+        """
+        Escolhe, por ordenação, o registro mantido de cada código de chamado.
+
+        Ordena as linhas por (código, não positiva, posição original); a primeira
+        linha de cada código após a ordenação é a mantida. Linhas sem código não
+        são deduplicadas. Custo O(n log n), sem cópias do DataFrame por grupo.
+
+        Returns:
+            Tupla (máscara booleana das linhas mantidas, relatório de deduplicação)
+        """
+        n = len(codigos)
+        grupos, valores = pd.factorize(codigos, sort=True)
+        posicoes = np.arange(n)
+        ordem = np.lexsort((posicoes, ~positivas, grupos))
+        grupos_ordenados = grupos[ordem]
+        inicio_grupo = np.ones(n, dtype=bool)
+        inicio_grupo[1:] = grupos_ordenados[1:] != grupos_ordenados[:-1]
+
+        manter = grupos < 0
+        manter[ordem[inicio_grupo & (grupos_ordenados >= 0)]] = True
+
+        # Auditoria apenas dos códigos com mais de um registro, na ordem dos códigos
+        com_codigo = grupos >= 0
+        tamanho_do_grupo = np.zeros(n, dtype=np.int64)
+        tamanho_do_grupo[com_codigo] = np.bincount(grupos[com_codigo], minlength=len(valores))[grupos[com_codigo]]
+        duplicadas = np.flatnonzero(tamanho_do_grupo > 1)
+        duplicadas = duplicadas[np.argsort(grupos[duplicadas], kind='stable')]
+        mantidas = duplicadas[manter[duplicadas]]
+        removidas = duplicadas[~manter[duplicadas]]
+        relatorio = RelatorioDeduplicacao(
+            codigos=valores[grupos[mantidas]],
+            mantidas=mantidas,
+            removidas=removidas,
+            inicio_removidas=np.searchsorted(grupos[removidas], grupos[mantidas]),
+            motivos=np.where(positivas[mantidas], MOTIVO_BOM_OTIMO, MOTIVO_PRIMEIRO).astype(np.int8),
+            indice=indice,
+        )
+        return manter, relatorio
+
+
+def deduplicar_csat(df: pd.DataFrame, coluna_codigo: str = COLUNA_CODIGO_CHAMADO,
+                    coluna_avaliacao: str = COLUNA_AVALIACAO_CSAT) -> Tuple[pd.DataFrame, RelatorioDeduplicacao]:
+    """
+    Regra única de deduplicação do CSAT, usada pelo CSATProcessor e pelos apps.
+
+    Para cada código de chamado fica a primeira avaliação Bom/Ótimo (sem
+    preferência entre as duas) ou, se não houver, o primeiro registro. Linhas
+    sem código são mantidas e a ordem original das linhas é preservada. Se `df`
+    já tiver a coluna 'Avaliacao_Positiva' (codificar_avaliacoes), ela é usada.
+
+    Returns:
+        Tupla (DataFrame desduplicado, relatório de deduplicação)
+    """
+    if COLUNA_POSITIVA in df.columns:
+        positivas = df[COLUNA_POSITIVA].to_numpy(dtype=bool)
+    else:
+        positivas = avaliacoes_positivas(df[coluna_avaliacao])
+    manter, relatorio = CSATProcessor._deduplicar(df[coluna_codigo], positivas, df.index)
+    return df[manter], relatorio
+
+
 # Remover a função processar_planilha_satisfacao se ela existia e não for mais usada
 # ou adaptá-la para chamar o método da classe se necessário
 # def processar_planilha_satisfacao(caminho_arquivo: str) -> dict:
@@ -0,0 +1,248 @@
+"""
+Cubo diário de chamados por (dia, analista)
+
+Materializa, uma vez por snapshot, somas e contagens das medidas numéricas e a
+quantidade de chamados distintos para cada par (dia, analista), em arrays
+densos. Os gráficos diários (TME/TMA/TMR, SLA, total de chamados) passam a
+fatiar e somar o cubo pelo período e pelos analistas selecionados, em vez de
+filtrar e agrupar as linhas de chamados a cada interação.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _codificar(valores: pd.Series):
+    """Códigos ordenados dos valores distintos; o valor ausente, se houver, fica com a última posição."""
+    codigos, rotulos = pd.factorize(valores, sort=True)
+    rotulos = list(rotulos)
+    if (codigos < 0).any():
+        codigos = np.where(codigos < 0, len(rotulos), codigos)
+        rotulos.append(None)
+    return codigos.astype(np.int64), rotulos
+
+
+class CuboDiario:
+    """
+    Somas, contagens de valores não nulos e chamados distintos por (dia, analista).
+
+    Arrays (D dias ordenados, A analistas, M medidas):
+        somas (D, A, M), contagens (D, A, M), linhas (D, A) e distintos (D, A).
+
+    Chamados distintos não são aditivos entre analistas quando um mesmo chamado
+    aparece, no mesmo dia, com mais de um analista; nesse caso as consultas de
+    um subconjunto de analistas recontam a partir dos pares (dia, analista,
+    chamado) já desduplicados, que são bem menos numerosos que as linhas.
+    """
+
+    def __init__(self, dias: np.ndarray, analistas: List, medidas: List[str], somas: np.ndarray,
+                 contagens: np.ndarray, linhas: np.ndarray, distintos: np.ndarray,
+                 distintos_dia: np.ndarray, trios: np.ndarray, num_chamados: int):
+        self.dias = dias
+        self.analistas = analistas
+        self.medidas = medidas
+        self.somas = somas
+        self.contagens = contagens
+        self.linhas = linhas
+        self.distintos = distintos
+        self.distintos_dia = distintos_dia
+        self._posicao_analista = {analista: i for i, analista in enumerate(analistas)}
+        # Chaves (dia, analista, chamado) distintas, para recontar subconjuntos de analistas
+        self._trios = trios
+        self._num_chamados = num_chamados
+        self.chamados_compartilhados = bool(distintos.sum() != distintos_dia.sum())
+        # Argumentos de a_partir_de, para recalcular dias sem repetir as colunas
+        self.origem: Optional[Dict] = None
+
+    @classmethod
+    def vazio(cls, medidas: Iterable[str] = ()) -> "CuboDiario":
+        medidas = list(medidas)
+        return cls(np.array([], dtype="datetime64[ns]"), [], medidas, np.zeros((0, 0, len(medidas))),
+                   np.zeros((0, 0, len(medidas)), dtype=np.int64), np.zeros((0, 0), dtype=np.int64),
+                   np.zeros((0, 0), dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0)
+
+    @classmethod
+    def a_partir_de(cls, df: pd.DataFrame, coluna_data: str, coluna_analista: Optional[str],
+                    coluna_chamado: Optional[str], medidas: Dict[str, str]) -> "CuboDiario":
+        """
+        Constrói o cubo a partir das linhas de chamados.
+
+        Args:
+            df: Chamados; linhas sem data são ignoradas
+            coluna_data: Coluna datetime que define o dia
+            coluna_analista: Coluna do analista (None: um único analista ausente)
+            coluna_chamado: Coluna do código do chamado, para os distintos (None: sem distintos)
+            medidas: Nome da medida no cubo -> coluna de origem. Colunas ausentes ou
+                não numéricas ficam fora do cubo.
+        """
+        origem = {"coluna_data": coluna_data, "coluna_analista": coluna_analista,
+                  "coluna_chamado": coluna_chamado, "medidas": dict(medidas)}
+        medidas = {nome: coluna for nome, coluna in medidas.items()
+                   if coluna in df.columns and pd.api.types.is_numeric_dtype(df[coluna])}
+        if df.empty or coluna_data not in df.columns:
+            cubo = cls.vazio(medidas)
+            cubo.origem = origem
+            return cubo
+
+        datas = pd.to_datetime(df[coluna_data], errors="coerce")
+        com_data = datas.notna().to_numpy()
+        df = df[com_data]
+        codigos_dia, dias = pd.factorize(datas[com_data].dt.normalize(), sort=True)
+        if coluna_analista is not None and coluna_analista in df.columns:
+            codigos_analista, analistas = _codificar(df[coluna_analista])
+        else:
+            codigos_analista, analistas = np.zeros(len(df), dtype=np.int64), [None]
+        num_dias, num_analistas = len(dias), len(analistas)
+        celula = codigos_dia * num_analistas + codigos_analista
+        tamanho = num_dias * num_analistas
+
+        somas = np.zeros((tamanho, len(medidas)))
+        contagens = np.zeros((tamanho, len(medidas)), dtype=np.int64)
+        for j, coluna in enumerate(medidas.values()):
+            valores = df[coluna].to_numpy(dtype=np.float64, na_value=np.nan)
+            validos = ~np.isnan(valores)
+            somas[:, j] = np.bincount(celula[validos], weights=valores[validos], minlength=tamanho)
+            contagens[:, j] = np.bincount(celula[validos], minlength=tamanho)
+        linhas = np.bincount(celula, minlength=tamanho)
+
+        # Chamados distintos por (dia, analista) e por dia, ignorando códigos ausentes como o nunique
+        if coluna_chamado is not None and coluna_chamado in df.columns:
+            codigos_chamado, chamados = pd.factorize(df[coluna_chamado])
+            com_codigo = codigos_chamado >= 0
+            num_chamados = max(len(chamados), 1)
+            trios = np.unique(celula[com_codigo] * num_chamados + codigos_chamado[com_codigo])
+            distintos = np.bincount(trios // num_chamados, minlength=tamanho)
+            pares_dia = np.unique(codigos_dia[com_codigo] * num_chamados + codigos_chamado[com_codigo])
+            distintos_dia = np.bincount(pares_dia // num_chamados, minlength=num_dias)
+        else:
+            num_chamados, trios = 1, np.zeros(0, dtype=np.int64)
+            distintos, distintos_dia = np.zeros(tamanho, dtype=np.int64), np.zeros(num_dias, dtype=np.int64)
+
+        logger.info(f"Cubo diário construído: {num_dias} dias x {num_analistas} analistas x {len(medidas)} medidas.")
+        cubo = cls(
+            dias.to_numpy(dtype="datetime64[ns]"), analistas, list(medidas),
+            somas.reshape(num_dias, num_analistas, -1), contagens.reshape(num_dias, num_analistas, -1),
+            linhas.reshape(num_dias, num_analistas), distintos.reshape(num_dias, num_analistas),
+            distintos_dia, trios, num_chamados
+        )
+        cubo.origem = origem
+        return cubo
+
+    def atualizar_dias(self, df_dias: pd.DataFrame, dias: Iterable) -> "CuboDiario":
+        """
+        Novo cubo com os `dias` recalculados a partir de `df_dias`, que deve trazer todas
+        as linhas desses dias (e só delas); os demais dias são copiados deste cubo.
+
+        O custo é o de construir o cubo das linhas de `df_dias` mais a cópia dos arrays,
+        em vez de agrupar de novo a base inteira. Os códigos de chamado dos pares
+        desduplicados só precisam ser consistentes dentro de cada dia, então cada
+        parte mantém os seus.
+
+        Raises:
+            ValueError: Cubo sem `origem`, linhas fora de `dias` ou medidas diferentes
+                das deste cubo; nesses casos o cubo deve ser reconstruído com a_partir_de
+        """
+        if self.origem is None:
+            raise ValueError("Cubo sem as colunas de origem; reconstrua com a_partir_de.")
+        recalculados = np.array(sorted({pd.Timestamp(dia).normalize().to_datetime64() for dia in dias}),
+                                dtype="datetime64[ns]")
+        parcial = CuboDiario.a_partir_de(df_dias, **self.origem)
+        if not np.isin(parcial.dias, recalculados).all():
+            raise ValueError("As linhas informadas incluem dias fora dos recalculados.")
+        if parcial.medidas != self.medidas:
+            raise ValueError("As linhas informadas não têm as mesmas medidas do cubo.")
+
+        mantidos = np.flatnonzero(~np.isin(self.dias, recalculados))
+        dias_novos = np.union1d(self.dias[mantidos], parcial.dias)
+        presentes = set(self.analistas) | set(parcial.analistas)
+        analistas = sorted(a for a in presentes if a is not None) + ([None] if None in presentes else [])
+        posicao = {analista: i for i, analista in enumerate(analistas)}
+        num_dias, num_analistas, num_chamados = len(dias_novos), len(analistas), max(self._num_chamados, parcial._num_chamados)
+
+        somas = np.zeros((num_dias, num_analistas, len(self.medidas)))
+        contagens = np.zeros((num_dias, num_analistas, len(self.medidas)), dtype=np.int64)
+        linhas = np.zeros((num_dias, num_analistas), dtype=np.int64)
+        distintos = np.zeros((num_dias, num_analistas), dtype=np.int64)
+        distintos_dia = np.zeros(num_dias, dtype=np.int64)
+        trios = []
+        for cubo, posicoes_dia in ((self, mantidos), (parcial, np.arange(len(parcial.dias)))):
+            destino_dia = np.searchsorted(dias_novos, cubo.dias[posicoes_dia])
+            destino_analista = np.array([posicao[a] for a in cubo.analistas], dtype=np.int64)
+            celulas = np.ix_(destino_dia, destino_analista)
+            somas[celulas] = cubo.somas[posicoes_dia]
+            contagens[celulas] = cubo.contagens[posicoes_dia]
+            linhas[celulas] = cubo.linhas[posicoes_dia]
+            distintos[celulas] = cubo.distintos[posicoes_dia]
+            distintos_dia[destino_dia] = cubo.distintos_dia[posicoes_dia]
+
+            # Reposiciona os pares (dia, analista, chamado) dos dias aproveitados na nova grade
+            mapa_dia = np.full(len(cubo.dias), -1, dtype=np.int64)
+            mapa_dia[posicoes_dia] = destino_dia
+            origem_chamados = max(cubo._num_chamados, 1)
+            celula, chamado = cubo._trios // origem_chamados, cubo._trios % origem_chamados
+            dia = mapa_dia[celula // max(len(cubo.analistas), 1)]
+            analista = destino_analista[celula % max(len(cubo.analistas), 1)]
+            aproveitados = dia >= 0
+            trios.append((dia[aproveitados] * num_analistas + analista[aproveitados]) * num_chamados + chamado[aproveitados])
+
+        logger.info(f"Cubo diário atualizado: {len(recalculados)} dia(s) recalculado(s) de {num_dias}.")
+        cubo = CuboDiario(dias_novos, analistas, list(self.medidas), somas, contagens, linhas, distintos,
+                          distintos_dia, np.concatenate(trios).astype(np.int64), num_chamados)
+        cubo.origem = self.origem
+        return cubo
+
+    def _fatia(self, analistas: Optional[Iterable], inicio, fim):
+        # Dias ordenados: o período vira um intervalo contíguo de posições
+        primeiro = 0 if inicio is None else int(np.searchsorted(self.dias, pd.Timestamp(inicio).normalize().to_datetime64(), "left"))
+        ultimo = len(self.dias) if fim is None else int(np.searchsorted(self.dias, pd.Timestamp(fim).normalize().to_datetime64(), "right"))
+        if analistas is None:
+            colunas = None
+        else:
+            colunas = np.array(sorted({self._posicao_analista[a] for a in analistas if a in self._posicao_analista}), dtype=np.int64)
+        return slice(primeiro, max(primeiro, ultimo)), colunas
+
+    def _somar(self, array: np.ndarray, dias: slice, colunas: Optional[np.ndarray]) -> np.ndarray:
+        fatia = array[dias]
+        if colunas is not None:
+            fatia = fatia[:, colunas]
+        return fatia.sum(axis=1)
+
+    def por_dia(self, medidas: Optional[Iterable[str]] = None, analistas: Optional[Iterable] = None,
+                inicio=None, fim=None) -> pd.DataFrame:
+        """
+        Média de cada medida por dia (índice 'Dia', ordenado) e 'Chamados' distintos,
+        somando os analistas selecionados entre `inicio` e `fim` (dias inclusivos).
+        Só entram os dias com alguma linha na seleção; dias sem valores de uma
+        medida ficam com NaN, como no groupby.
+        """
+        medidas = self.medidas if medidas is None else [m for m in medidas if m in self.medidas]
+        posicoes = [self.medidas.index(m) for m in medidas]
+        dias, colunas = self._fatia(analistas, inicio, fim)
+        linhas = self._somar(self.linhas, dias, colunas)
+        somas = self._somar(self.somas[:, :, posicoes], dias, colunas)
+        contagens = self._somar(self.contagens[:, :, posicoes], dias, colunas)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias = np.where(contagens > 0, somas / contagens, np.nan)
+
+        presentes = linhas > 0
+        tabela = pd.DataFrame(medias[presentes], columns=medidas,
+                              index=pd.DatetimeIndex(self.dias[dias][presentes], name="Dia"))
+        tabela["Chamados"] = self._distintos(dias, colunas)[presentes]
+        return tabela
+
+    def _distintos(self, dias: slice, colunas: Optional[np.ndarray]) -> np.ndarray:
+        if colunas is None or len(colunas) == len(self.analistas):
+            return self.distintos_dia[dias]
+        if not self.chamados_compartilhados:
+            return self._somar(self.distintos, dias, colunas)
+        # Um chamado com mais de um analista no dia só pode ser contado uma vez: reconta os pares
+        num_analistas = len(self.analistas)
+        celulas = self._trios // self._num_chamados
+        dia, analista = celulas // num_analistas, celulas % num_analistas
+        selecionados = (dia >= dias.start) & (dia < dias.stop) & np.isin(analista, colunas)
+        pares = np.unique(dia[selecionados] * self._num_chamados + self._trios[selecionados] % self._num_chamados)
+        return np.bincount(pares // self._num_chamados - dias.start, minlength=dias.stop - dias.start)
@@ -3,182 +3,345 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 import requests
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Mapping
 import logging
-from io import BytesIO
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from config import Config
-from csat_processor import CSATProcessor
+from csat_incremental import obter_csat_incremental
+from cubo_diario import CuboDiario
+from produtos_lazy import ProdutosLazy
+from metricas_analista import COLUNA_ATENDIMENTOS, metricas_por_analista
+from download_cache import obter_download_cache
+from column_registry import assinatura_colunas, filtro_usecols, registrar_colunas
+from schema import aplicar_schema
+from single_flight import obter_single_flight
 
 logger = logging.getLogger(__name__)
 
+# Colunas do Relatório de Chamados lidas por cada aba calculada
+registrar_colunas("chamados", "Metas Individuais", [
+    "Analista", "Código do Chamado", "Data de Abertura", "Tempo de Atendimento", "SLA 1º Atendimento", "SLA Resolução"
+])
+registrar_colunas("chamados", "Resultados área 1", [
+    "Data de Abertura", "CSAT", "CSAT_Ferramenta", "TMA", "TME", "TMR"
+])
+registrar_colunas("chamados", "Resultados área 2", [
+    "Data de Abertura", "Código do Chamado", "SLA 1º Atendimento", "SLA Resolução"
+])
+registrar_colunas("chamados", "Grafico-Individual_1", [
+    "Analista", "Código do Chamado", "TMA", "CSAT", "Percentual_Resposta_Pesquisa", "SLA 1º Atendimento", "SLA Resolução"
+])
+registrar_colunas("chamados", "Grafico-Individual_2", [
+    "Analista", "Código do Chamado", "TMA", "CSAT", "Percentual_Resposta_Pesquisa"
+])
+
+# Colunas da aba Metas Individuais, na ordem exibida
+METAS_COLUNAS = [
+    'Total Atendimentos', 'Media Atendimento', 'CSAT Obtido', 'Percentual_Resposta_Pesquisa',
+    'SLA 1º Atendimento', 'SLA Resolução'
+]
+# Medidas da aba Metas Individuais que são médias de colunas do Relatório de Chamados
+METAS_MEDIAS_CHAMADOS = {
+    'Media Atendimento': 'Tempo de Atendimento',
+    'SLA 1º Atendimento': 'SLA 1º Atendimento',
+    'SLA Resolução': 'SLA Resolução',
+}
+# Medidas dos cards dos Gráficos Individuais (médias de colunas do Relatório de Chamados)
+CARDS_MEDIAS_CHAMADOS = {
+    'TMA': 'TMA',
+    'CSAT': 'CSAT',
+    'Percentual_Resposta_Pesquisa': 'Percentual_Resposta_Pesquisa',
+    'SLA 1º Atendimento': 'SLA 1º Atendimento',
+    'SLA Resolução': 'SLA Resolução',
+}
+
+# Medidas diárias das abas Resultados área 1 e 2 (nome no cubo -> coluna do Relatório de Chamados)
+CUBO_MEDIAS_CHAMADOS = {
+    'CSAT_Analista': 'CSAT',
+    'CSAT_Ferramenta': 'CSAT_Ferramenta',
+    'TMA': 'TMA',
+    'TME': 'TME',
+    'TMR': 'TMR',
+    'SLA_1_Atendimento': 'SLA 1º Atendimento',
+    'SLA_Resolucao': 'SLA Resolução',
+}
+
 class DataProcessor:
     """Classe para processar dados da planilha Eloca"""
     
     def __init__(self):
         self.config = Config()
+        self.tempos_carga = {}
         
-    def _fetch_excel_from_url(self, url: str) -> Optional[BytesIO]:
+    def _fetch_excel_from_url(self, url: str) -> Optional[Dict[str, Any]]:
         """
-        Busca um arquivo Excel de uma URL e retorna como BytesIO.
+        Busca um arquivo Excel de uma URL, revalidando a cópia do cache em disco.
+        Retorna o resultado do DownloadCache (caminho do corpo e hash do conteúdo).
         """
         try:
             logger.info(f"Tentando buscar arquivo Excel da URL: {url}")
-            response = requests.get(url, headers=self.config.HEADERS, timeout=60) # Aumentar timeout
-            response.raise_for_status() # Levanta HTTPError para 4xx/5xx respostas
+            resultado = obter_download_cache().buscar(url, self.config.HEADERS)
             logger.info(f"Arquivo Excel da URL {url} buscado com sucesso.")
-            return BytesIO(response.content)
+            return resultado
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro ao buscar arquivo Excel da URL {url}: {e}")
             return None
 
-    def carregar_dados_completos(self) -> Dict[str, pd.DataFrame]:
+    def _carregar_fonte(self, nome: str, url: str, sheet_name: str) -> Dict[str, Any]:
         """
-        Carrega todos os dados das URLs configuradas e processa as abas.
-        Retorna um dicionário com DataFrames processados para cada aba do dashboard e CSAT.
+        Baixa e lê uma aba de uma das fontes Excel, medindo o tempo de cada etapa.
+        Falhas ficam registradas no resultado da própria fonte, sem afetar as demais.
+        Se o conteúdo não mudou desde a última carga, o parse é reaproveitado.
         """
-        dados_dashboard = {}
-        df_chamados = pd.DataFrame()
-        df_pesquisa_satisfacao = pd.DataFrame()
+        resultado = {'fonte': nome, 'df': pd.DataFrame(), 'erro': None, 'content_hash': None,
+                     'tempo_download': 0.0, 'tempo_parse': 0.0, 'tempo_total': 0.0}
+        inicio = time.perf_counter()
 
-        # 1. Carregar Relatório de Chamados
-        excel_chamados_bytes = self._fetch_excel_from_url(self.config.URL_RELATORIO_CHAMADOS)
-        if excel_chamados_bytes:
-            try:
-                # Apenas a aba 'Relatório_Chamados_08-04-2024_1' será lida deste arquivo
-                df_chamados = pd.read_excel(excel_chamados_bytes, sheet_name="Relatório_Chamados_08-04-2024_1")
-                logger.info(f"Aba 'Relatório_Chamados_08-04-2024_1' carregada com {len(df_chamados)} linhas.")
-            except Exception as e:
-                logger.error(f"Erro ao ler aba 'Relatório_Chamados_08-04-2024_1' do URL_RELATORIO_CHAMADOS: {e}")
-        else:
-            logger.warning("Não foi possível carregar o arquivo de Relatório de Chamados da URL.")
+        download = self._fetch_excel_from_url(url)
+        resultado['tempo_download'] = time.perf_counter() - inicio
 
-        # 2. Carregar Pesquisa de Satisfação (CSAT)
-        excel_pesquisa_bytes = self._fetch_excel_from_url(self.config.URL_PESQUISA_SATISFACAO)
-        if excel_pesquisa_bytes:
+        if download is None:
+            resultado['erro'] = f"Não foi possível baixar o arquivo da fonte '{nome}'."
+        else:
+            inicio_parse = time.perf_counter()
             try:
-                # Apenas a aba 'Pesquisa de Satisfação' será lida deste arquivo
-                df_pesquisa_satisfacao = pd.read_excel(excel_pesquisa_bytes, sheet_name="Pesquisa de Satisfação")
-                logger.info(f"Aba 'Pesquisa de Satisfação' carregada com {len(df_pesquisa_satisfacao)} linhas.")
-                # Processar CSAT imediatamente
-                csat_processor = CSATProcessor()
-                dados_dashboard["CSAT"] = csat_processor.processar_planilha_satisfacao_df(df_pesquisa_satisfacao)
-                logger.info(f"Dados CSAT processados com {len(dados_dashboard['CSAT'])} linhas.")
+                # Só as colunas declaradas no column_registry são lidas do Excel, já com os tipos do schema
+                resultado['df'] = obter_download_cache().obter_frame(
+                    f"{url}#{sheet_name}#{assinatura_colunas(nome)}", download['content_hash'],
+                    lambda: aplicar_schema(
+                        pd.read_excel(download['caminho'], sheet_name=sheet_name, usecols=filtro_usecols(nome)), nome
+                    )
+                )
+                resultado['content_hash'] = download['content_hash']
+                logger.info(f"Aba '{sheet_name}' carregada com {len(resultado['df'])} linhas.")
             except Exception as e:
-                logger.error(f"Erro ao ler aba 'Pesquisa de Satisfação' do URL_PESQUISA_SATISFACAO: {e}")
+                resultado['erro'] = f"Erro ao ler aba '{sheet_name}' da fonte '{nome}': {e}"
+            resultado['tempo_parse'] = time.perf_counter() - inicio_parse
+
+        resultado['tempo_total'] = time.perf_counter() - inicio
+        return resultado
+
+    def _carregar_fontes_em_paralelo(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Baixa e lê o Relatório de Chamados e a Pesquisa de Satisfação em paralelo,
+        de modo que o tempo total seja aproximadamente o da fonte mais lenta.
+
+        Returns:
+            Dict com o resultado de cada fonte (DataFrame, erro e tempos em segundos)
+        """
+        fontes = {
+            "chamados": (self.config.URL_RELATORIO_CHAMADOS, "Relatório_Chamados_08-04-2024_1"),
+            "pesquisa_satisfacao": (self.config.URL_PESQUISA_SATISFACAO, "Pesquisa de Satisfação"),
+        }
+        resultados = {}
+        inicio = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=len(fontes), thread_name_prefix="eloca-fetch") as executor:
+            futuros = {
+                nome: executor.submit(self._carregar_fonte, nome, url, sheet_name)
+                for nome, (url, sheet_name) in fontes.items()
+            }
+            for nome, futuro in futuros.items():
+                try:
+                    resultados[nome] = futuro.result()
+                except Exception as e:
+                    resultados[nome] = {'fonte': nome, 'df': pd.DataFrame(), 'erro': str(e), 'content_hash': None,
+                                        'tempo_download': 0.0, 'tempo_parse': 0.0, 'tempo_total': 0.0}
+
+        tempo_total = time.perf_counter() - inicio
+        for nome, resultado in resultados.items():
+            if resultado['erro']:
+                logger.error(resultado['erro'])
+            logger.info(
+                f"Fonte '{nome}': download {resultado['tempo_download']:.2f}s, "
+                f"parse {resultado['tempo_parse']:.2f}s, total {resultado['tempo_total']:.2f}s"
+            )
+        logger.info(f"Carga paralela das fontes concluída em {tempo_total:.2f}s")
+
+        self.tempos_carga = {
+            nome: {chave: resultado[chave] for chave in ('tempo_download', 'tempo_parse', 'tempo_total')}
+            for nome, resultado in resultados.items()
+        }
+        self.tempos_carga['paralelo_total'] = tempo_total
+        return resultados
+
+    def carregar_dados_completos(self) -> Mapping[str, Any]:
+        """
+        Carrega todos os dados das URLs configuradas e prepara as abas.
+        Retorna um Mapping (ProdutosLazy) com os resultados de cada aba do dashboard e o CSAT,
+        cada um calculado no primeiro acesso e memorizado para o snapshot.
+
+        Chamadas concorrentes (várias sessões com o cache frio) compartilham uma única
+        carga em andamento, em vez de baixar e processar os relatórios várias vezes.
+        """
+        chave = ("carregar_dados_completos", self.config.URL_RELATORIO_CHAMADOS, self.config.URL_PESQUISA_SATISFACAO)
+        return obter_single_flight().executar(chave, self._carregar_dados_completos)
+
+    def _carregar_dados_completos(self) -> Mapping[str, Any]:
+        fabricas = {}
+
+        # 1 e 2. Carregar Relatório de Chamados e Pesquisa de Satisfação (CSAT) em paralelo
+        fontes = self._carregar_fontes_em_paralelo()
+        df_chamados = fontes["chamados"]['df']
+        df_pesquisa_satisfacao = fontes["pesquisa_satisfacao"]['df']
+
+        if not df_pesquisa_satisfacao.empty:
+            fabricas["CSAT"] = lambda: self._processar_csat(df_pesquisa_satisfacao)
         else:
             logger.warning("Não foi possível carregar o arquivo de Pesquisa de Satisfação da URL.")
 
-        # 3. Calcular as abas do dashboard a partir dos dados brutos
+        if df_chamados.empty:
+            logger.warning("Não foi possível carregar o arquivo de Relatório de Chamados da URL.")
+
+        # 3. Abas do dashboard, calculadas só quando uma página as pede; a preparação dos
+        # chamados é compartilhada e feita no primeiro acesso a qualquer uma delas
         if not df_chamados.empty:
-            dados_dashboard["Metas Individuais"] = self._calcular_metas_individuais(df_chamados, dados_dashboard.get("CSAT", pd.DataFrame()))
-            dados_dashboard["Resultados área 1"] = self._calcular_resultados_area1(df_chamados)
-            dados_dashboard["Resultados área 2"] = self._calcular_resultados_area2(df_chamados)
-            dados_dashboard["Grafico-Individual_1"] = self._calcular_grafico_individual_1(df_chamados)
-            dados_dashboard["Grafico-Individual_2"] = self._calcular_grafico_individual_2(df_chamados)
+            preparados = ProdutosLazy({
+                "chamados": lambda: self._preparar_chamados(df_chamados),
+                # Só as abas de Resultados leem o cubo; as demais não pagam pela sua construção
+                "cubo": lambda: CuboDiario.a_partir_de(preparados["chamados"]["com_data"], 'Dia', 'Analista',
+                                                       'Código do Chamado', CUBO_MEDIAS_CHAMADOS),
+            })
+
+            def csat_processado():
+                return dados_dashboard["CSAT"] if "CSAT" in dados_dashboard else pd.DataFrame()
+
+            fabricas.update({
+                "Metas Individuais": lambda: self._calcular_metas_individuais(preparados["chamados"]["com_data"], csat_processado()),
+                "Resultados área 1": lambda: self._calcular_resultados_area1(preparados["cubo"]),
+                "Resultados área 2": lambda: self._calcular_resultados_area2(preparados["cubo"]),
+                "Grafico-Individual_1": lambda: self._calcular_grafico_individual_1(preparados["chamados"]["todos"]),
+                "Grafico-Individual_2": lambda: self._calcular_grafico_individual_2(preparados["chamados"]["todos"]),
+            })
         else:
             logger.warning("DataFrame de chamados vazio. Não foi possível calcular as abas do dashboard.")
             for aba in self.config.ABAS_DASHBOARD:
-                dados_dashboard[aba] = pd.DataFrame()
+                fabricas[aba] = pd.DataFrame
 
-        if not dados_dashboard: 
+        if not fabricas:
             logger.error("Nenhum dado foi carregado ou processado para o dashboard. Verifique as URLs e permissões.")
             return {}
 
-        logger.info(f"Dados do dashboard carregados e processados com sucesso. {len(dados_dashboard)} abas/itens processados")
+        # Os produtos dependem só do conteúdo dos dois relatórios lidos
+        assinatura = tuple(fontes[nome]['content_hash'] for nome in ("chamados", "pesquisa_satisfacao"))
+        dados_dashboard = ProdutosLazy(fabricas, assinatura=None if None in assinatura else assinatura)
+        logger.info(f"Dados do dashboard carregados com sucesso. {len(dados_dashboard)} abas/itens calculados sob demanda")
         return dados_dashboard
+
+    def _processar_csat(self, df_pesquisa_satisfacao: pd.DataFrame) -> Any:
+        """
+        Sincroniza a Pesquisa de Satisfação com o CSATIncremental do processo, que só
+        aplica as respostas acrescentadas desde a exportação anterior, e devolve as
+        métricas dele; em caso de erro, registra e devolve um DataFrame vazio.
+        """
+        try:
+            metricas = obter_csat_incremental("pesquisa_satisfacao").sincronizar(df_pesquisa_satisfacao)
+            logger.info(f"Dados CSAT sincronizados: {metricas['lote']['recebidas']} de {len(df_pesquisa_satisfacao)} linhas aplicadas.")
+            return {'sucesso': True, 'metricas': metricas}
+        except Exception as e:
+            logger.error(f"Erro ao processar a Pesquisa de Satisfação: {e}")
+            return pd.DataFrame()
     
     # --- Métodos para replicar a lógica das abas de cálculo --- #
 
-    def _calcular_metas_individuais(self, df_chamados: pd.DataFrame, df_csat_processado: pd.DataFrame) -> pd.DataFrame:
+    def _preparar_chamados(self, df_chamados: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Prepara o Relatório de Chamados uma única vez para todas as abas calculadas.
+
+        Converte 'Data de Abertura' (se ainda não for datetime) e acrescenta 'Dia',
+        a data de abertura truncada no dia. O DataFrame recebido não é alterado.
+
+        Returns:
+            Dict com 'todos' (todos os chamados) e 'com_data' (apenas os com
+            'Data de Abertura' válida). Os _calcular_* apenas leem esses DataFrames.
+        """
+        if df_chamados.empty or 'Data de Abertura' not in df_chamados.columns:
+            return {"todos": df_chamados, "com_data": df_chamados}
+
+        datas = pd.to_datetime(df_chamados['Data de Abertura'], errors='coerce')
+        todos = df_chamados.assign(**{'Data de Abertura': datas, 'Dia': datas.dt.normalize()})
+        com_data = todos[datas.notna().to_numpy()]
+        return {"todos": todos, "com_data": com_data}
+
+    @staticmethod
+    def _por_data(agregado_diario: pd.DataFrame) -> pd.DataFrame:
+        """Converte um agregado indexado por 'Dia' para o formato das abas, com a coluna 'Data' (date)."""
+        agregado_diario.index = agregado_diario.index.date
+        return agregado_diario.rename_axis('Data').reset_index()
+
+    def _calcular_metas_individuais(self, df_chamados: pd.DataFrame, csat_processado: Any) -> pd.DataFrame:
+        """
+        Métricas por analista da aba Metas Individuais em uma única agregação agrupada.
+
+        Chamados únicos, média de atendimento e médias de SLA saem de um só groupby
+        por 'Analista'; CSAT e % de resposta são alinhados pelo índice do analista.
+        Medidas sem coluna numérica de origem ficam como 'N/A'.
+
+        Espera os chamados com data válida de _preparar_chamados.
+        """
         if df_chamados.empty:
             return pd.DataFrame()
-        
-        # Certificar-se de que 'Data de Abertura' é datetime
-        if 'Data de Abertura' in df_chamados.columns:
-            df_chamados['Data de Abertura'] = pd.to_datetime(df_chamados['Data de Abertura'], errors='coerce')
-            df_chamados = df_chamados.dropna(subset=['Data de Abertura'])
-
-        # 1. Total Atendimentos por Analista
-        total_atendimentos = df_chamados.groupby('Analista')['Código do Chamado'].nunique().reset_index()
-        total_atendimentos.columns = ['Analista', 'Total Atendimentos']
-
-        # 2. Média Atendimento (assumindo que é por período, aqui farei por analista)
-        # Para TMA, TME, TMR, preciso das colunas de tempo. Vou assumir que existem ou calcular a partir de datas.
-        # Se 'Tempo de Atendimento' existe e é numérico
-        if 'Tempo de Atendimento' in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados['Tempo de Atendimento']):
-            media_atendimento = df_chamados.groupby('Analista')['Tempo de Atendimento'].mean().reset_index()
-            media_atendimento.columns = ['Analista', 'Media Atendimento']
-        else:
-            media_atendimento = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'Media Atendimento': 'N/A'})
 
-        # 3. CSAT Obtido (usar o df_csat_processado)
-        if not df_csat_processado.empty and 'Analista' in df_csat_processado.columns and 'CSAT' in df_csat_processado.columns:
-            csat_obtido = df_csat_processado.groupby('Analista')['CSAT'].mean().reset_index()
-            csat_obtido.columns = ['Analista', 'CSAT Obtido']
-        else:
-            csat_obtido = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'CSAT Obtido': 'N/A'})
-
-        # 4. % Resposta Pesquisa (assumindo que df_csat_processado tem 'Total Pesquisas' e 'Respostas')
-        if not df_csat_processado.empty and 'Analista' in df_csat_processado.columns and 'Total Pesquisas' in df_csat_processado.columns and 'Respostas' in df_csat_processado.columns:
-            respostas_pesquisa = df_csat_processado.groupby('Analista').agg(
-                Total_Pesquisas=('Total Pesquisas', 'sum'),
-                Respostas=('Respostas', 'sum')
-            ).reset_index()
-            respostas_pesquisa['Percentual_Resposta_Pesquisa'] = (respostas_pesquisa['Respostas'] / respostas_pesquisa['Total_Pesquisas']) * 100
-            respostas_pesquisa = respostas_pesquisa[['Analista', 'Percentual_Resposta_Pesquisa']]
-        else:
-            respostas_pesquisa = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'Percentual_Resposta_Pesquisa': 'N/A'})
+        medidas = {'Total Atendimentos': ('Código do Chamado', 'nunique')}
+        for medida, coluna in METAS_MEDIAS_CHAMADOS.items():
+            if coluna in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados[coluna]):
+                medidas[medida] = (coluna, 'mean')
+        df_metas = df_chamados.groupby('Analista', observed=True).agg(**medidas)
 
-        # 5. SLA 1º Atendimento e SLA Resolução (assumindo colunas de SLA no df_chamados)
-        # Se 'SLA 1º Atendimento' e 'SLA Resolução' existem e são numéricas (representando %)
-        if 'SLA 1º Atendimento' in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados['SLA 1º Atendimento']):
-            sla_primeiro = df_chamados.groupby('Analista')['SLA 1º Atendimento'].mean().reset_index()
-            sla_primeiro.columns = ['Analista', 'SLA 1º Atendimento']
-        else:
-            sla_primeiro = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'SLA 1º Atendimento': 'N/A'})
+        csat_por_analista = self._csat_por_analista(csat_processado)
+        for coluna in csat_por_analista.columns:
+            df_metas[coluna] = csat_por_analista[coluna]
 
-        if 'SLA Resolução' in df_chamados.columns and pd.api.types.is_numeric_dtype(df_chamados['SLA Resolução']):
-            sla_resolucao = df_chamados.groupby('Analista')['SLA Resolução'].mean().reset_index()
-            sla_resolucao.columns = ['Analista', 'SLA Resolução']
-        else:
-            sla_resolucao = pd.DataFrame({'Analista': df_chamados['Analista'].unique(), 'SLA Resolução': 'N/A'})
+        return df_metas.reindex(columns=METAS_COLUNAS, fill_value='N/A').reset_index()
 
-        # Juntar tudo
-        df_metas = total_atendimentos.merge(media_atendimento, on='Analista', how='left')
-        df_metas = df_metas.merge(csat_obtido, on='Analista', how='left')
-        df_metas = df_metas.merge(respostas_pesquisa, on='Analista', how='left')
-        df_metas = df_metas.merge(sla_primeiro, on='Analista', how='left')
-        df_metas = df_metas.merge(sla_resolucao, on='Analista', how='left')
+    @staticmethod
+    def _csat_por_analista(csat_processado: Any) -> pd.DataFrame:
+        """
+        CSAT obtido e % de resposta por analista, indexados pelo nome do analista.
 
-        return df_metas
+        Aceita o resultado de _processar_csat (usa os contadores por analista do
+        CSATIncremental) ou um DataFrame com 'Analista' e as colunas 'CSAT',
+        'Total Pesquisas' e 'Respostas'.
+        """
+        if isinstance(csat_processado, dict):
+            por_analista = csat_processado.get('metricas', {}).get('por_analista', {})
+            scores = {analista: contadores['csat_score'] for analista, contadores in por_analista.items() if analista is not None}
+            if not scores:
+                return pd.DataFrame()
+            return pd.DataFrame({'CSAT Obtido': pd.Series(scores, dtype=np.float32)}).sort_index()
+
+        if not isinstance(csat_processado, pd.DataFrame) or csat_processado.empty or 'Analista' not in csat_processado.columns:
+            return pd.DataFrame()
+        medidas = {}
+        if 'CSAT' in csat_processado.columns:
+            medidas['CSAT Obtido'] = ('CSAT', 'mean')
+        if 'Total Pesquisas' in csat_processado.columns and 'Respostas' in csat_processado.columns:
+            medidas['Total_Pesquisas'] = ('Total Pesquisas', 'sum')
+            medidas['Respostas'] = ('Respostas', 'sum')
+        if not medidas:
+            return pd.DataFrame()
+        resultado = csat_processado.groupby('Analista', observed=True).agg(**medidas)
+        if 'Respostas' in resultado.columns:
+            resultado['Percentual_Resposta_Pesquisa'] = resultado.pop('Respostas') / resultado.pop('Total_Pesquisas') * 100
+        return resultado
 
-    def _calcular_resultados_area1(self, df_chamados: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-        if df_chamados.empty:
+    def _calcular_resultados_area1(self, cubo: CuboDiario) -> Dict[str, pd.DataFrame]:
+        if len(cubo.dias) == 0:
             return {}
 
-        # Assumindo que 'Data de Abertura' é a coluna de data
-        df_chamados['Data de Abertura'] = pd.to_datetime(df_chamados['Data de Abertura'], errors='coerce')
-        df_chamados = df_chamados.dropna(subset=['Data de Abertura'])
-        df_chamados['Data'] = df_chamados['Data de Abertura'].dt.date
+        # Médias diárias lidas do cubo diário dos chamados com data
+        diario = cubo.por_dia()
 
         # Gráfico de CSAT por Data (assumindo que CSAT já está no df_chamados ou pode ser calculado)
         # Para replicar a imagem, preciso de 'CSAT do Analista' e 'CSAT da Ferramenta'
-        # Vou usar um placeholder aqui, idealmente viria do CSAT processado
-        # Se não tiver CSAT no df_chamados, este gráfico será vazio ou com N/A
-        csat_por_data = df_chamados.groupby('Data').agg(
-            CSAT_Analista=('CSAT', 'mean'), # Assumindo que 'CSAT' é uma coluna no df_chamados
-            CSAT_Ferramenta=('CSAT_Ferramenta', 'mean') # Assumindo que 'CSAT_Ferramenta' é uma coluna
-        ).reset_index()
+        # Se não tiver CSAT no df_chamados, este gráfico fica com 0
+        csat_por_data = self._por_data(diario.reindex(columns=['CSAT_Analista', 'CSAT_Ferramenta']))
         csat_por_data = csat_por_data.fillna(0) # Preencher N/A com 0 para visualização
 
         # Gráfico de TMA, TME, TMR por Data
-        # Assumindo que 'TMA', 'TME', 'TMR' são colunas numéricas no df_chamados
-        tma_tme_tmr_por_data = df_chamados.groupby('Data').agg(
-            TMA=('TMA', 'mean'),
-            TME=('TME', 'mean'),
-            TMR=('TMR', 'mean')
-        ).reset_index()
+        tma_tme_tmr_por_data = self._por_data(diario.reindex(columns=['TMA', 'TME', 'TMR']))
         tma_tme_tmr_por_data = tma_tme_tmr_por_data.fillna(0)
 
         return {
@@ -186,31 +349,29 @@ class DataProcessor:
             "tma_tme_tmr_por_data": tma_tme_tmr_por_data
         }
 
-    def _calcular_resultados_area2(self, df_chamados: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-        if df_chamados.empty:
+    def _calcular_resultados_area2(self, cubo: CuboDiario) -> Dict[str, pd.DataFrame]:
+        if len(cubo.dias) == 0:
             return {}
 
-        df_chamados['Data de Abertura'] = pd.to_datetime(df_chamados['Data de Abertura'], errors='coerce')
-        df_chamados = df_chamados.dropna(subset=['Data de Abertura'])
-        df_chamados['Data'] = df_chamados['Data de Abertura'].dt.date
+        diario = cubo.por_dia()
 
         # Gráfico de SLA 1º Atendimento e SLA Resolução por Data
-        # Assumindo que 'SLA 1º Atendimento' e 'SLA Resolução' são colunas numéricas no df_chamados
-        sla_por_data = df_chamados.groupby('Data').agg(
-            SLA_1_Atendimento=('SLA 1º Atendimento', 'mean'),
-            SLA_Resolucao=('SLA Resolução', 'mean')
-        ).reset_index()
+        sla_por_data = self._por_data(diario.reindex(columns=['SLA_1_Atendimento', 'SLA_Resolucao']))
         sla_por_data = sla_por_data.fillna(0)
 
-        # Gráfico de Total de Chamados por Data
-        total_chamados_por_data = df_chamados.groupby('Data')['Código do Chamado'].nunique().reset_index()
-        total_chamados_por_data.columns = ['Data', 'Total']
+        # Gráfico de Total de Chamados por Data (chamados distintos por dia)
+        total_chamados_por_data = self._por_data(diario[['Chamados']].rename(columns={'Chamados': 'Total'}))
 
         return {
             "sla_por_data": sla_por_data,
             "total_chamados_por_data": total_chamados_por_data
         }
 
+    @staticmethod
+    def _valor_card(cards: pd.DataFrame, analista: str, medida: str) -> Any:
+        """Valor de uma medida do card do analista, ou 'N/A' se a coluna de origem não for numérica."""
+        return float(cards.at[analista, medida]) if medida in cards.columns else 'N/A'
+
     def _calcular_grafico_individual_1(self, df_chamados: pd.DataFrame) -> Dict[str, Any]:
         if df_chamados.empty:
             return {}
@@ -222,16 +383,16 @@ class DataProcessor:
         # Assumindo que 'Analista' é a coluna de analistas
         analistas_especificos = ['Elô', 'Kauan', 'Pedro', 'Mateus']
         analista_data = {}
+        # Todos os valores dos cards numa única agregação; o loop apenas consulta a tabela
+        cards = metricas_por_analista(df_chamados, 'Analista', 'Código do Chamado', CARDS_MEDIAS_CHAMADOS, analistas_especificos)
 
         for analista in analistas_especificos:
-            df_analista = df_chamados[df_chamados['Analista'] == analista]
-            
-            atendimentos_dia = df_analista['Código do Chamado'].nunique() # Contagem única de chamados
-            tma = df_analista['TMA'].mean() if 'TMA' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['TMA']) else 'N/A'
-            csat = df_analista['CSAT'].mean() if 'CSAT' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['CSAT']) else 'N/A'
-            percentual_resposta_pesquisa = df_analista['Percentual_Resposta_Pesquisa'].mean() if 'Percentual_Resposta_Pesquisa' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['Percentual_Resposta_Pesquisa']) else 'N/A'
-            sla_primeiro_atendimento = df_analista['SLA 1º Atendimento'].mean() if 'SLA 1º Atendimento' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['SLA 1º Atendimento']) else 'N/A'
-            sla_resolucao = df_analista['SLA Resolução'].mean() if 'SLA Resolução' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['SLA Resolução']) else 'N/A'
+            atendimentos_dia = int(cards.at[analista, COLUNA_ATENDIMENTOS]) # Contagem única de chamados
+            tma = self._valor_card(cards, analista, 'TMA')
+            csat = self._valor_card(cards, analista, 'CSAT')
+            percentual_resposta_pesquisa = self._valor_card(cards, analista, 'Percentual_Resposta_Pesquisa')
+            sla_primeiro_atendimento = self._valor_card(cards, analista, 'SLA 1º Atendimento')
+            sla_resolucao = self._valor_card(cards, analista, 'SLA Resolução')
 
             analista_data[analista] = {
                 'Atendimentos dia': atendimentos_dia,
@@ -254,14 +415,13 @@ class DataProcessor:
         # Cards por analista (Jonielson, Rosana, Marcos, Sarah, Graziele, Virgilio) - Replicar a estrutura da imagem
         analistas_especificos = ['Jonielson', 'Rosana', 'Marcos', 'Sarah', 'Graziele', 'Virgilio']
         analista_data = {}
+        cards = metricas_por_analista(df_chamados, 'Analista', 'Código do Chamado', CARDS_MEDIAS_CHAMADOS, analistas_especificos)
 
         for analista in analistas_especificos:
-            df_analista = df_chamados[df_chamados['Analista'] == analista]
-            
-            atendimentos_dia = df_analista['Código do Chamado'].nunique()
-            tma = df_analista['TMA'].mean() if 'TMA' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['TMA']) else 'N/A'
-            csat = df_analista['CSAT'].mean() if 'CSAT' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['CSAT']) else 'N/A'
-            percentual_resposta_pesquisa = df_analista['Percentual_Resposta_Pesquisa'].mean() if 'Percentual_Resposta_Pesquisa' in df_analista.columns and pd.api.types.is_numeric_dtype(df_analista['Percentual_Resposta_Pesquisa']) else 'N/A'
+            atendimentos_dia = int(cards.at[analista, COLUNA_ATENDIMENTOS])
+            tma = self._valor_card(cards, analista, 'TMA')
+            csat = self._valor_card(cards, analista, 'CSAT')
+            percentual_resposta_pesquisa = self._valor_card(cards, analista, 'Percentual_Resposta_Pesquisa')
 
             analista_data[analista] = {
                 'Atendimentos dia': atendimentos_dia,
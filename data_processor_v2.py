@@ -9,6 +9,7 @@ from io import BytesIO
 
 from config import Config
 from csat_processor import CSATProcessor
+from eloca_client import obter_cliente_eloca
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +25,7 @@ class DataProcessor:
         """
         try:
             logger.info(f"Tentando buscar arquivo Excel da URL: {url}")
-            response = requests.get(url, headers=self.config.HEADERS, timeout=60) # Aumentar timeout
+            response = obter_cliente_eloca().get(url, headers=self.config.HEADERS)
             response.raise_for_status() # Levanta HTTPError para 4xx/5xx respostas
             logger.info(f"Arquivo Excel da URL {url} buscado com sucesso.")
             return BytesIO(response.content)
@@ -0,0 +1,185 @@
+"""
+Cache persistente dos relatórios baixados da Eloca, com revalidação condicional HTTP
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+import requests
+
+from config import Config
+from eloca_client import obter_cliente_eloca
+from snapshot_cache import obter_snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCache:
+    """
+    Guarda em disco o corpo de cada relatório e, por URL, os metadados com
+    ETag, Last-Modified e hash SHA-256 do conteúdo.
+
+    O corpo é gravado num arquivo nomeado pela URL e pelo hash do conteúdo, que
+    nunca é sobrescrito com outro conteúdo: quem recebeu o caminho de `buscar`
+    pode parseá-lo mesmo que outra busca da mesma URL traga um relatório novo
+    nesse meio tempo. O corpo da versão anterior é mantido e o da penúltima é
+    removido a cada troca.
+
+    A cada busca a URL é revalidada com If-None-Match/If-Modified-Since. Se a
+    Eloca responder 304, ou devolver um corpo com o mesmo hash, os DataFrames
+    já parseados daquele conteúdo são reaproveitados sem ler o Excel de novo.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None):
+        self.diretorio = diretorio or Config.DOWNLOAD_CACHE_DIR
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+        # chave do consumidor -> (content_hash, DataFrame parseado)
+        self._frames: Dict[str, tuple] = {}
+
+    def _caminho_base(self, url: str) -> str:
+        return os.path.join(self.diretorio, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _gravar_atomico(self, caminho: str, escrever: Callable[[Any], None], modo: str = "wb") -> None:
+        """Grava via um temporário exclusivo no mesmo diretório e o troca por `caminho` com os.replace."""
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, modo, **({} if "b" in modo else {"encoding": "utf-8"})) as arquivo:
+                escrever(arquivo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temporario)
+            raise
+
+    def obter_metadados(self, url: str) -> Optional[Dict[str, Any]]:
+        """Retorna os metadados salvos para a URL, se o corpo correspondente existir em disco."""
+        base = self._caminho_base(url)
+        try:
+            with open(base + ".json", encoding="utf-8") as arquivo:
+                metadados = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        return metadados if os.path.exists(metadados.get("caminho", "")) else None
+
+    def _salvar(self, url: str, corpo: Optional[str], content_hash: str, tamanho: int,
+                etag: Optional[str], last_modified: Optional[str]) -> Dict[str, Any]:
+        """Move o arquivo `corpo` (se houver) para o caminho do conteúdo e grava os metadados da URL."""
+        base = self._caminho_base(url)
+        anteriores = self.obter_metadados(url) or {}
+        metadados = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "tamanho": tamanho,
+            "caminho": f"{base}-{content_hash}.xlsx",
+            "caminho_anterior": anteriores.get("caminho_anterior"),
+        }
+        # Escrita atômica: o corpo e depois os metadados são trocados via os.replace
+        if corpo is not None:
+            os.replace(corpo, metadados["caminho"])
+        if anteriores.get("caminho") not in (None, metadados["caminho"]):
+            # Conteúdo novo: a versão anterior continua em disco para quem ainda a está lendo
+            metadados["caminho_anterior"] = anteriores["caminho"]
+            obsoleto = anteriores.get("caminho_anterior")
+            if obsoleto not in (None, metadados["caminho"], metadados["caminho_anterior"]):
+                with contextlib.suppress(OSError):
+                    os.remove(obsoleto)
+        self._gravar_atomico(base + ".json", lambda arquivo: json.dump(metadados, arquivo), "w")
+        return metadados
+
+    def buscar(self, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Busca o relatório revalidando a cópia em disco.
+
+        O corpo é gravado em blocos num arquivo temporário do próprio diretório do
+        cache (ElocaClient.baixar, que também repete leituras interrompidas),
+        calculando o hash no caminho, e movido com os.replace para o caminho do
+        conteúdo: o workbook nunca fica inteiro em RAM e é escrito uma única vez.
+
+        Returns:
+            Dict com 'caminho' do corpo em disco, 'content_hash', 'last_modified', 'status'
+            HTTP e 'alterado' (False quando o conteúdo é o mesmo da última busca)
+
+        Raises:
+            requests.exceptions.RequestException: em falhas de conexão ou status 4xx/5xx
+        """
+        metadados = self.obter_metadados(url)
+        headers_requisicao = dict(headers)
+        if metadados:
+            if metadados.get("etag"):
+                headers_requisicao["If-None-Match"] = metadados["etag"]
+            if metadados.get("last_modified"):
+                headers_requisicao["If-Modified-Since"] = metadados["last_modified"]
+
+        download = obter_cliente_eloca().baixar(url, self.diretorio, headers=headers_requisicao)
+        if download["status"] == 304:
+            if not metadados:
+                raise requests.exceptions.HTTPError(f"Resposta 304 para {url} sem cópia em disco para reutilizar.")
+            logger.info(f"Relatório da URL {url} não modificado (304). Reutilizando cópia em disco.")
+            return {"caminho": metadados["caminho"], "content_hash": metadados["content_hash"],
+                    "last_modified": metadados.get("last_modified"), "status": 304, "alterado": False}
+
+        content_hash, corpo = download["content_hash"], download["caminho"]
+        try:
+            alterado = not metadados or metadados["content_hash"] != content_hash
+            # Corpo idêntico ao que já está em disco: só os metadados são atualizados
+            novos_metadados = self._salvar(url, corpo if alterado else None, content_hash, download["tamanho"],
+                                           download["etag"], download["last_modified"])
+        finally:
+            # Já movido para o caminho do conteúdo, ou descartado
+            with contextlib.suppress(OSError):
+                os.remove(corpo)
+
+        if not alterado:
+            logger.info(f"Relatório da URL {url} baixado, mas com conteúdo idêntico ao anterior.")
+        return {"caminho": novos_metadados["caminho"], "content_hash": content_hash,
+                "last_modified": novos_metadados["last_modified"], "status": download["status"], "alterado": alterado}
+
+    def obter_frame(self, chave: str, content_hash: str, parser: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Retorna o DataFrame parseado para `chave`, executando `parser` apenas
+        quando o conteúdo (`content_hash`) mudou desde o último parse.
+
+        Na ausência de um parse em memória, o snapshot Feather do mesmo conteúdo
+        é lido do disco; só então o Excel é parseado (e o snapshot gravado).
+        O DataFrame devolvido é o próprio memorizado, compartilhado com os demais
+        chamadores e com o snapshot do atualizador: é somente leitura, e quem
+        precisar alterá-lo deve derivar um novo (assign, copy).
+        """
+        with self._lock:
+            memo = self._frames.get(chave)
+        if memo is not None and memo[0] == content_hash:
+            logger.info(f"Conteúdo de '{chave}' inalterado. Parse do Excel ignorado.")
+            return memo[1]
+
+        snapshots = obter_snapshot_cache()
+        variante = hashlib.sha256(chave.encode("utf-8")).hexdigest()[:16]
+        df = snapshots.carregar(content_hash, variante)
+        if df is None:
+            df = parser()
+            snapshots.salvar(content_hash, variante, df)
+
+        with self._lock:
+            self._frames[chave] = (content_hash, df)
+        return df
+
+
+_download_cache: Optional[DownloadCache] = None
+_download_cache_lock = threading.Lock()
+
+
+def obter_download_cache() -> DownloadCache:
+    """Retorna a instância de DownloadCache compartilhada pelo processo."""
+    global _download_cache
+    with _download_cache_lock:
+        if _download_cache is None:
+            _download_cache = DownloadCache()
+        return _download_cache
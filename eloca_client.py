@@ -0,0 +1,170 @@
+"""
+Cliente HTTP compartilhado para as chamadas à Eloca (Desk.ms)
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Status HTTP considerados transitórios e que justificam repetir o GET
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+
+# Falhas que podem interromper a leitura de um corpo já iniciado (conexão caída, timeout de leitura)
+ERROS_LEITURA_REPETIVEIS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# Tamanho dos blocos lidos da resposta HTTP e copiados para disco
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def baixar_para_arquivo(response: requests.Response, destino: BinaryIO) -> Tuple[str, int]:
+    """
+    Copia o corpo de uma resposta aberta com stream=True para `destino`, em blocos.
+
+    Returns:
+        Tupla (hash SHA-256 do conteúdo, tamanho em bytes)
+    """
+    sha = hashlib.sha256()
+    tamanho = 0
+    for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+        if bloco:
+            sha.update(bloco)
+            destino.write(bloco)
+            tamanho += len(bloco)
+    return sha.hexdigest(), tamanho
+
+
+class ElocaClient:
+    """
+    Sessão HTTP com pool de conexões keep-alive, timeouts de conexão e de
+    leitura separados e novas tentativas com backoff exponencial com jitter.
+
+    Só GETs passam por aqui, então repetir uma requisição é sempre seguro;
+    em baixar(), isso inclui recomeçar um download interrompido no meio do corpo.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None, tentativas: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 timeout_conexao: Optional[float] = None, timeout_leitura: Optional[float] = None):
+        self.pool_size = pool_size or Config.ELOCA_POOL_SIZE
+        self.tentativas = tentativas if tentativas is not None else Config.ELOCA_RETRIES
+        self.backoff_base = backoff_base if backoff_base is not None else Config.ELOCA_BACKOFF_BASE
+        self.backoff_max = backoff_max if backoff_max is not None else Config.ELOCA_BACKOFF_MAX
+        self.timeout = (
+            timeout_conexao if timeout_conexao is not None else Config.ELOCA_CONNECT_TIMEOUT,
+            timeout_leitura if timeout_leitura is not None else Config.ELOCA_READ_TIMEOUT,
+        )
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = Config.HEADERS["User-Agent"]
+        # As repetições são feitas em get(), com jitter; o adapter só cuida do pool
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _espera(self, tentativa: int, response: Optional[requests.Response] = None) -> float:
+        """Backoff exponencial com 'full jitter', respeitando Retry-After quando informado."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** tentativa)))
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        """
+        Executa um GET, repetindo em erros de conexão, timeouts e status transitórios.
+
+        Returns:
+            A resposta da última tentativa (o chamador decide sobre raise_for_status)
+
+        Raises:
+            requests.exceptions.RequestException: se todas as tentativas falharem na conexão
+        """
+        for tentativa in range(self.tentativas + 1):
+            ultima = tentativa == self.tentativas
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if ultima:
+                    raise
+                espera = self._espera(tentativa)
+                logger.warning(f"Falha ao acessar {url} ({e}). Nova tentativa em {espera:.1f}s.")
+                time.sleep(espera)
+                continue
+
+            if response.status_code in STATUS_REPETIVEIS and not ultima:
+                espera = self._espera(tentativa, response)
+                logger.warning(f"Status {response.status_code} em {url}. Nova tentativa em {espera:.1f}s.")
+                response.close()
+                time.sleep(espera)
+                continue
+            return response
+
+    def baixar(self, url: str, diretorio: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Executa um GET e grava o corpo, em blocos, num arquivo temporário novo em `diretorio`.
+
+        Além das repetições de get(), uma leitura do corpo interrompida no meio
+        (ChunkedEncodingError, conexão caída, timeout de leitura) também é repetida
+        com backoff, recomeçando o download do zero num arquivo temporário novo.
+
+        Returns:
+            Dict com 'status', 'etag', 'last_modified' e, exceto em respostas 304, o
+            'caminho' do arquivo temporário (que o chamador deve mover ou remover),
+            'content_hash' e 'tamanho' do corpo
+
+        Raises:
+            requests.exceptions.RequestException: se todas as tentativas falharem ou em status 4xx/5xx
+        """
+        for tentativa in range(self.tentativas + 1):
+            with self.get(url, headers=headers, stream=True) as response:
+                resultado = {"status": response.status_code, "etag": response.headers.get("ETag"),
+                             "last_modified": response.headers.get("Last-Modified"),
+                             "caminho": None, "content_hash": None, "tamanho": 0}
+                if response.status_code == 304:
+                    return resultado
+                response.raise_for_status()
+
+                descritor, caminho = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+                try:
+                    with os.fdopen(descritor, "wb") as arquivo:
+                        resultado["content_hash"], resultado["tamanho"] = baixar_para_arquivo(response, arquivo)
+                except BaseException as e:
+                    with contextlib.suppress(OSError):
+                        os.remove(caminho)
+                    if not isinstance(e, ERROS_LEITURA_REPETIVEIS) or tentativa == self.tentativas:
+                        raise
+                    espera = self._espera(tentativa)
+                    logger.warning(f"Download de {url} interrompido ({e}). Recomeçando em {espera:.1f}s.")
+                    time.sleep(espera)
+                    continue
+                resultado["caminho"] = caminho
+                return resultado
+
+
+_cliente: Optional[ElocaClient] = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente_eloca() -> ElocaClient:
+    """Retorna o ElocaClient compartilhado pelo processo."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ElocaClient()
+        return _cliente
@@ -0,0 +1,87 @@
+"""
+Índices bitmap para os filtros por dimensão (operador, área, canal, tipo de problema)
+
+Para cada valor de uma dimensão de baixa cardinalidade guarda um bitmap
+compactado (np.packbits) das linhas em que ele aparece, construído uma vez por
+snapshot. Um filtro combinado é avaliado com OR entre os valores selecionados
+de cada dimensão e AND entre as dimensões, em vez de comparar strings linha a
+linha a cada interação.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceBitmap:
+    """
+    Bitmaps por (dimensão, valor) sobre as posições das linhas de um DataFrame.
+
+    As posições são as do DataFrame indexado; se ele estiver ordenado por data
+    (IndiceTemporal), os filtros compõem com a fatia do período. Valores
+    ausentes não entram em nenhum bitmap, como no `isin`.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensoes: Iterable[str]):
+        self.num_linhas = len(df)
+        self._bitmaps: Dict[str, Dict[Any, np.ndarray]] = {}
+        for dimensao in dimensoes:
+            if dimensao not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[dimensao], sort=True)
+            self._bitmaps[dimensao] = {valor: np.packbits(codigos == i) for i, valor in enumerate(valores)}
+        logger.info(
+            f"Índice bitmap construído para {self.num_linhas} linhas: "
+            + ", ".join(f"{dimensao} ({len(bitmaps)} valores)" for dimensao, bitmaps in self._bitmaps.items())
+        )
+
+    @property
+    def dimensoes(self) -> List[str]:
+        return list(self._bitmaps)
+
+    def valores(self, dimensao: str) -> List:
+        """Valores indexados da dimensão, em ordem."""
+        return list(self._bitmaps.get(dimensao, {}))
+
+    def _vazio(self, preenchimento: int = 0) -> np.ndarray:
+        return np.full((self.num_linhas + 7) // 8, preenchimento, dtype=np.uint8)
+
+    def bitmap(self, filtros: Mapping[str, Optional[Iterable]]) -> np.ndarray:
+        """
+        Bitmap compactado das linhas que atendem a todos os filtros
+        (dimensão -> valores aceitos; None não filtra a dimensão).
+
+        Raises:
+            KeyError: se uma dimensão filtrada não estiver indexada
+        """
+        resultado = None
+        for dimensao, valores in filtros.items():
+            if valores is None:
+                continue
+            bitmaps = self._bitmaps[dimensao]
+            aceitos = self._vazio()
+            for valor in valores:
+                if valor in bitmaps:
+                    aceitos |= bitmaps[valor]
+            resultado = aceitos if resultado is None else resultado & aceitos
+        return self._vazio(0xFF) if resultado is None else resultado
+
+    def mascara(self, filtros: Mapping[str, Optional[Iterable]], posicoes: slice = slice(None)) -> np.ndarray:
+        """Máscara booleana das linhas em `posicoes` que atendem aos filtros (desempacota só os bytes da fatia)."""
+        inicio, fim, _ = posicoes.indices(self.num_linhas)
+        if fim <= inicio:
+            return np.zeros(0, dtype=bool)
+        primeiro_byte = inicio // 8
+        bits = np.unpackbits(self.bitmap(filtros)[primeiro_byte:(fim + 7) // 8])
+        return bits[inicio - primeiro_byte * 8:fim - primeiro_byte * 8].view(bool)
+
+    def filtrar(self, df: pd.DataFrame, filtros: Mapping[str, Optional[Iterable]],
+                posicoes: slice = slice(None)) -> pd.DataFrame:
+        """Linhas de `df` (o DataFrame indexado) em `posicoes` que atendem aos filtros."""
+        fatia = df.iloc[posicoes]
+        if all(valores is None for valores in filtros.values()):
+            return fatia
+        return fatia[self.mascara(filtros, posicoes)]
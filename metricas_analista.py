@@ -0,0 +1,42 @@
+"""
+Métricas dos cards por analista
+
+Calcula, numa única agregação agrupada, todos os valores exibidos nos cards
+dos analistas (chamados distintos e médias das colunas numéricas). As páginas
+apenas consultam a tabela resultante, em vez de filtrar o DataFrame inteiro
+uma vez por analista.
+"""
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+COLUNA_ATENDIMENTOS = "Atendimentos"
+
+
+def metricas_por_analista(df: pd.DataFrame, coluna_analista: str, coluna_chamado: str,
+                          medias: Dict[str, str], analistas: Optional[Iterable] = None) -> pd.DataFrame:
+    """
+    Tabela indexada por analista com 'Atendimentos' (chamados distintos) e a
+    média de cada coluna de `medias` (nome no resultado -> coluna de origem).
+
+    Medidas cuja coluna de origem não existe ou não é numérica ficam fora da
+    tabela. Se `analistas` for informado, a tabela traz exatamente esses
+    analistas, na mesma ordem; os sem chamados ficam com 0 atendimentos e
+    médias NaN, como a média de uma seleção vazia.
+    """
+    if analistas is not None:
+        analistas = list(analistas)
+        df = df[df[coluna_analista].isin(analistas)]
+
+    agregacoes = {COLUNA_ATENDIMENTOS: (coluna_chamado, "nunique")}
+    agregacoes.update({
+        nome: (coluna, "mean") for nome, coluna in medias.items()
+        if coluna in df.columns and pd.api.types.is_numeric_dtype(df[coluna])
+    })
+    tabela = df.groupby(coluna_analista, observed=True).agg(**agregacoes)
+
+    if analistas is not None:
+        tabela.index = tabela.index.astype(object)
+        tabela = tabela.reindex(pd.Index(analistas, name=coluna_analista))
+        tabela[COLUNA_ATENDIMENTOS] = tabela[COLUNA_ATENDIMENTOS].fillna(0).astype(int)
+    return tabela
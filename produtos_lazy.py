@@ -0,0 +1,62 @@
+"""
+Produtos do dashboard calculados sob demanda
+
+Um Mapping cujos valores são calculados no primeiro acesso e memorizados. O
+snapshot da carga guarda as funções de cálculo de cada aba, e cada página paga
+apenas pelas abas que exibe; o resultado é compartilhado pelas sessões que
+usam o mesmo snapshot.
+"""
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProdutosLazy(Mapping):
+    """
+    Mapping de nome -> produto, calculado por `fabricas[nome]()` no primeiro acesso.
+
+    Cada produto tem o seu lock: sessões concorrentes que pedem o mesmo produto
+    esperam um único cálculo, e produtos diferentes são calculados em paralelo.
+    Se o cálculo falhar, a exceção é propagada e nada é memorizado, de modo que
+    o próximo acesso tenta de novo. Iterar por `values()` ou `items()` calcula
+    todos os produtos; para olhar só os já prontos, use `calculados()`.
+
+    `assinatura` identifica, se conhecido, o conteúdo de origem dos produtos.
+    """
+
+    def __init__(self, fabricas: Dict[str, Callable[[], Any]], assinatura: Optional[Hashable] = None):
+        self._fabricas = dict(fabricas)
+        self.assinatura = assinatura
+        self._valores: Dict[str, Any] = {}
+        self._locks = {nome: threading.Lock() for nome in self._fabricas}
+        self.tempos: Dict[str, float] = {}
+
+    def __getitem__(self, nome: str) -> Any:
+        if nome in self._valores:
+            return self._valores[nome]
+        fabrica = self._fabricas[nome]
+        with self._locks[nome]:
+            if nome not in self._valores:
+                inicio = time.perf_counter()
+                self._valores[nome] = fabrica()
+                self.tempos[nome] = time.perf_counter() - inicio
+                logger.info(f"Produto '{nome}' calculado sob demanda em {self.tempos[nome]:.2f}s.")
+        return self._valores[nome]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fabricas)
+
+    def __len__(self) -> int:
+        return len(self._fabricas)
+
+    def calculados(self) -> Dict[str, Any]:
+        """Produtos já calculados, sem disparar o cálculo dos demais."""
+        return dict(self._valores)
+
+    def pendentes(self) -> List[str]:
+        """Nomes dos produtos ainda não calculados."""
+        return [nome for nome in self._fabricas if nome not in self._valores]
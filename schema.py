@@ -0,0 +1,147 @@
+"""
+Schema tipado dos relatórios Eloca (chamados e pesquisa de satisfação)
+
+Cada fonte declara o dtype de suas colunas: nomes de operador e textos de
+avaliação como categóricos, datas como datetime64 (com formato explícito
+quando conhecido) e durações/SLA como float32. O schema é aplicado uma única
+vez no parse, e o resultado fica nos snapshots já com os tipos compactos.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUNA_AVALIACAO_CSAT = "Atendimento - CES e CSAT - [ANALISTA] Como você avalia a qualidade do atendimento prestado pelo analista neste chamado?"
+
+# Tipos aceitos: "datetime" (com "formato" opcional), "category", "float32", "Int32", "Int8"
+SCHEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    # Relatório de Chamados lido pelo DataProcessor
+    "chamados": {
+        "Data de Abertura": {"tipo": "datetime"},
+        "Analista": {"tipo": "category"},
+        "Tempo de Atendimento": {"tipo": "float32"},
+        "TMA": {"tipo": "float32"},
+        "TME": {"tipo": "float32"},
+        "TMR": {"tipo": "float32"},
+        "SLA 1º Atendimento": {"tipo": "float32"},
+        "SLA Resolução": {"tipo": "float32"},
+        "CSAT": {"tipo": "float32"},
+        "CSAT_Ferramenta": {"tipo": "float32"},
+        "Percentual_Resposta_Pesquisa": {"tipo": "float32"},
+    },
+    # Pesquisa de Satisfação lida pelo DataProcessor
+    "pesquisa_satisfacao": {
+        "Data da Pesquisa": {"tipo": "datetime", "formato": "%d/%m/%Y"},
+        "Analista Responsável": {"tipo": "category"},
+        "Área": {"tipo": "category"},
+        "Canal de Atendimento": {"tipo": "category"},
+        "Tipo de Problema": {"tipo": "category"},
+        COLUNA_AVALIACAO_CSAT: {"tipo": "category"},
+        "Cliente Satisfeito": {"tipo": "category"},
+        "Recomendaria o Serviço": {"tipo": "category"},
+        "Tempo de Resolução (horas)": {"tipo": "float32"},
+        "Score NPS": {"tipo": "Int8"},
+    },
+    # Relatório operacional lido pelo app_combined_fixed
+    "operacional": {
+        "Data de Criação": {"tipo": "datetime"},
+        "Data da Primeira Resposta": {"tipo": "datetime"},
+        "Data da Resolução": {"tipo": "datetime"},
+        "Data do Primeiro Atendimento": {"tipo": "datetime"},
+        "Data do Segundo Atendimento": {"tipo": "datetime"},
+        "Data de Finalização": {"tipo": "datetime"},
+        "Nome Completo do Operador": {"tipo": "category"},
+        "Área": {"tipo": "category"},
+        "Canal de Atendimento": {"tipo": "category"},
+        "Tipo de Problema": {"tipo": "category"},
+        "SLA 1º Atendimento": {"tipo": "float32"},
+        "SLA Resolução": {"tipo": "float32"},
+    },
+    # CSAT já desduplicado pelo app_combined_fixed
+    "csat": {
+        "Avaliacao_Qualidade": {"tipo": "category"},
+        "Data da Pesquisa": {"tipo": "datetime", "formato": "%d/%m/%Y"},
+    },
+}
+
+# Último relatório de memória (antes/depois) de cada fonte, para diagnóstico
+RELATORIOS_MEMORIA: Dict[str, Dict[str, Any]] = {}
+
+# Regras por trecho do nome, para colunas cuja lista varia com a exportação
+PADROES: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {
+    "operacional": [("Tempo Útil", {"tipo": "float32"})],
+}
+
+
+def _converter(serie: pd.Series, definicao: Dict[str, Any]) -> pd.Series:
+    tipo = definicao["tipo"]
+    if tipo == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        return pd.to_datetime(serie, format=definicao.get("formato"), errors="coerce")
+    if tipo == "category":
+        return serie.astype("category")
+    # Numéricos: valores não numéricos viram NaN/NA antes do downcast
+    numerica = pd.to_numeric(serie, errors="coerce")
+    if tipo in ("Int32", "Int8"):
+        return numerica.round().astype(tipo)
+    return numerica.astype(tipo)
+
+
+def definicao_coluna(fonte: str, coluna: str) -> Optional[Dict[str, Any]]:
+    """Retorna a definição de tipo da coluna na fonte (declarada ou por padrão), se houver."""
+    definicao = SCHEMAS.get(fonte, {}).get(coluna)
+    if definicao is not None:
+        return definicao
+    for trecho, definicao_padrao in PADROES.get(fonte, []):
+        if trecho in str(coluna):
+            return definicao_padrao
+    return None
+
+
+def aplicar_schema(df: pd.DataFrame, fonte: str) -> pd.DataFrame:
+    """
+    Converte as colunas presentes em `df` para os tipos declarados da fonte.
+    Colunas sem declaração são mantidas como vieram. O DataFrame é alterado no lugar e retornado;
+    a comparação de memória antes/depois fica em RELATORIOS_MEMORIA[fonte].
+    """
+    if df.empty:
+        return df
+
+    memoria_antes = df.memory_usage(deep=True)
+    for coluna in df.columns:
+        definicao = definicao_coluna(fonte, coluna)
+        if definicao is None:
+            continue
+        try:
+            df[coluna] = _converter(df[coluna], definicao)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Coluna '{coluna}' mantida sem conversão para {definicao['tipo']}: {e}")
+
+    relatorio = relatorio_memoria(memoria_antes, df.memory_usage(deep=True))
+    RELATORIOS_MEMORIA[fonte] = relatorio
+    logger.info(
+        f"Schema '{fonte}' aplicado: {relatorio['bytes_antes'] / 1024 / 1024:.1f} MB -> "
+        f"{relatorio['bytes_depois'] / 1024 / 1024:.1f} MB ({relatorio['reducao_percentual']:.0f}% menor)"
+    )
+    return df
+
+
+def relatorio_memoria(memoria_antes: pd.Series, memoria_depois: pd.Series) -> Dict[str, Any]:
+    """
+    Compara o uso de memória por coluna (saídas de `DataFrame.memory_usage(deep=True)`).
+
+    Returns:
+        Dict com totais antes/depois, redução percentual e um DataFrame por coluna
+    """
+    por_coluna = pd.DataFrame({"bytes_antes": memoria_antes, "bytes_depois": memoria_depois}).fillna(0)
+    bytes_antes = int(por_coluna["bytes_antes"].sum())
+    bytes_depois = int(por_coluna["bytes_depois"].sum())
+    return {
+        "bytes_antes": bytes_antes,
+        "bytes_depois": bytes_depois,
+        "reducao_percentual": (1 - bytes_depois / bytes_antes) * 100 if bytes_antes else 0.0,
+        "por_coluna": por_coluna,
+    }
@@ -0,0 +1,81 @@
+"""
+Single-flight para a carga dos dados: chamadas concorrentes com a mesma chave
+esperam uma única execução em andamento e compartilham o seu resultado
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+        self.aguardando = 0
+
+
+class SingleFlight:
+    """Coalesce chamadas concorrentes por chave e contabiliza cargas executadas e coalescidas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento: Dict[Hashable, _Chamada] = {}
+        self.executadas = 0
+        self.coalescidas = 0
+
+    def executar(self, chave: Hashable, funcao: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executa `funcao(*args, **kwargs)`, a menos que já exista uma execução com a
+        mesma `chave` em andamento; nesse caso espera por ela e devolve o mesmo
+        resultado (ou relança a mesma exceção).
+        """
+        with self._lock:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_andamento[chave] = chamada
+                self.executadas += 1
+            else:
+                chamada.aguardando += 1
+                self.coalescidas += 1
+
+        if not lider:
+            logger.info(f"Carga '{chave}' já em andamento; aguardando o resultado compartilhado.")
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao(*args, **kwargs)
+            return chamada.resultado
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+            if chamada.aguardando:
+                logger.info(f"Carga '{chave}' compartilhada com {chamada.aguardando} chamada(s) concorrente(s).")
+            chamada.evento.set()
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores de cargas executadas, coalescidas e em andamento."""
+        with self._lock:
+            return {
+                "executadas": self.executadas,
+                "coalescidas": self.coalescidas,
+                "em_andamento": len(self._em_andamento),
+            }
+
+
+_single_flight = SingleFlight()
+
+
+def obter_single_flight() -> SingleFlight:
+    """Retorna o SingleFlight compartilhado pelo processo."""
+    return _single_flight
@@ -0,0 +1,148 @@
+"""
+Snapshots colunares (Arrow IPC/Feather) dos DataFrames parseados dos relatórios Eloca
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import pandas as pd
+
+from config import Config
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow acompanha o streamlit, mas é opcional aqui
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Incrementar sempre que o parse/tratamento dos relatórios mudar, invalidando snapshots antigos
+SNAPSHOT_VERSAO = 4
+
+
+class SnapshotCache:
+    """
+    Guarda o DataFrame tipado resultante do parse de um relatório em um arquivo
+    Feather nomeado pelo SHA-256 dos bytes do Excel.
+
+    Cargas posteriores do mesmo conteúdo, inclusive após reiniciar o processo,
+    mapeiam o arquivo em memória em vez de parsear o Excel de novo. Na conversão
+    para DataFrame, as colunas de texto (strings Arrow do pandas) continuam
+    apontando para o arquivo mapeado, sem cópia; as numéricas e de data são
+    materializadas pelo pandas, liberando cada coluna Arrow assim que convertida.
+
+    Snapshots mais velhos que `idade_maxima` são removidos e, se o total em disco
+    passar de `bytes_maximos`, os menos usados recentemente são removidos primeiro.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None, idade_maxima: Optional[int] = None,
+                 bytes_maximos: Optional[int] = None):
+        self.diretorio = diretorio or Config.SNAPSHOT_DIR
+        self.idade_maxima = idade_maxima if idade_maxima is not None else Config.SNAPSHOT_MAX_AGE
+        self.bytes_maximos = bytes_maximos if bytes_maximos is not None else Config.SNAPSHOT_MAX_BYTES
+        self.habilitado = feather is not None
+        self._lock = threading.Lock()
+        if self.habilitado:
+            os.makedirs(self.diretorio, exist_ok=True)
+        else:
+            logger.warning("pyarrow não instalado. Snapshots em Feather desabilitados.")
+
+    def _caminho(self, content_hash: str, variante: str) -> str:
+        return os.path.join(self.diretorio, f"{content_hash}-{variante}-v{SNAPSHOT_VERSAO}.feather")
+
+    def carregar(self, content_hash: str, variante: str) -> Optional[pd.DataFrame]:
+        """Lê o snapshot do conteúdo via memory-map, ou retorna None se não existir."""
+        if not self.habilitado:
+            return None
+        caminho = self._caminho(content_hash, variante)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            # Sem consolidar blocos e liberando cada coluna Arrow já convertida, a tabela e o
+            # DataFrame não coexistem inteiros; o texto continua sobre o mapa
+            df = feather.read_table(caminho, memory_map=True).to_pandas(self_destruct=True, split_blocks=True)
+        except Exception as e:
+            logger.warning(f"Snapshot {caminho} ilegível, será descartado: {e}")
+            self._remover(caminho)
+            return None
+        # Atualiza o mtime para que a remoção por tamanho preserve os snapshots em uso
+        os.utime(caminho)
+        logger.info(f"Snapshot {os.path.basename(caminho)} carregado com {len(df)} linhas.")
+        return df
+
+    def salvar(self, content_hash: str, variante: str, df: pd.DataFrame) -> bool:
+        """Grava o snapshot do conteúdo e aplica a política de remoção. Retorna True se gravou."""
+        if not self.habilitado:
+            return False
+        caminho = self._caminho(content_hash, variante)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        try:
+            # Sem compressão, para que a leitura por memory-map não precise descompactar
+            feather.write_feather(df, temporario, compression="uncompressed")
+            os.replace(temporario, caminho)
+        except Exception as e:
+            # Colunas com tipos mistos (comum em exportações Excel) não são serializáveis em Arrow
+            logger.warning(f"Não foi possível gravar o snapshot {os.path.basename(caminho)}: {e}")
+            self._remover(temporario)
+            return False
+        self.remover_antigos()
+        return True
+
+    def remover_antigos(self) -> int:
+        """Remove snapshots expirados e, depois, os mais antigos até caber em `bytes_maximos`."""
+        if not self.habilitado:
+            return 0
+        with self._lock:
+            agora = time.time()
+            snapshots = []
+            for nome in os.listdir(self.diretorio):
+                if not nome.endswith(".feather"):
+                    continue
+                caminho = os.path.join(self.diretorio, nome)
+                try:
+                    info = os.stat(caminho)
+                except OSError:
+                    continue
+                snapshots.append((info.st_mtime, info.st_size, caminho))
+
+            removidos = 0
+            restantes = []
+            for mtime, tamanho, caminho in snapshots:
+                if agora - mtime > self.idade_maxima:
+                    removidos += self._remover(caminho)
+                else:
+                    restantes.append((mtime, tamanho, caminho))
+
+            total = sum(tamanho for _, tamanho, _ in restantes)
+            for mtime, tamanho, caminho in sorted(restantes):
+                if total <= self.bytes_maximos:
+                    break
+                removidos += self._remover(caminho)
+                total -= tamanho
+
+        if removidos:
+            logger.info(f"{removidos} snapshot(s) removido(s) pela política de retenção.")
+        return removidos
+
+    @staticmethod
+    def _remover(caminho: str) -> int:
+        try:
+            os.remove(caminho)
+            return 1
+        except OSError:
+            return 0
+
+
+_snapshot_cache: Optional[SnapshotCache] = None
+_snapshot_cache_lock = threading.Lock()
+
+
+def obter_snapshot_cache() -> SnapshotCache:
+    """Retorna a instância de SnapshotCache compartilhada pelo processo."""
+    global _snapshot_cache
+    with _snapshot_cache_lock:
+        if _snapshot_cache is None:
+            _snapshot_cache = SnapshotCache()
+        return _snapshot_cache
@@ -0,0 +1,309 @@
+"""
+Base local de chamados com ingestão incremental (upsert por 'Nº Chamado')
+
+Cada nova exportação da Eloca é comparada linha a linha (por hash) com a base
+local: só chamados novos ou alterados entram no delta e chamados que saíram da
+janela da exportação são preservados. Em disco, cada delta vira um arquivo
+próprio ao lado da base, que só é regravada inteira a cada
+`TICKET_STORE_MAX_DELTAS` deltas.
+
+Agregados derivados da base (o CuboDiario e o AgregadoCSAT das páginas) podem
+ser registrados com `manter_agregado`: a store guarda o objeto construído e, a
+cada upsert, o atualiza só com os chamados e os dias afetados pelo delta.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+COLUNA_HASH = "_hash_linha"
+
+
+class TicketStore:
+    """Base de chamados persistida em disco, com watermark de 'Data de Criação' e Last-Modified."""
+
+    def __init__(self, nome: str, coluna_chave: str = "Nº Chamado", coluna_data: str = "Data de Criação",
+                 diretorio: Optional[str] = None):
+        self.nome = nome
+        self.coluna_chave = coluna_chave
+        self.coluna_data = coluna_data
+        self.diretorio = diretorio or Config.TICKET_STORE_DIR
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._df: Optional[pd.DataFrame] = None
+        # Base no formato de dados(), reaproveitada até o próximo upsert
+        self._publicado: Optional[pd.DataFrame] = None
+        self._agregados: Dict[str, Dict[str, Any]] = {}
+        self.watermark: Dict[str, Any] = {}
+        self._carregar_do_disco()
+
+    @property
+    def _caminho_dados(self) -> str:
+        return os.path.join(self.diretorio, f"{self.nome}.pkl")
+
+    def _caminho_delta(self, numero: int) -> str:
+        return os.path.join(self.diretorio, f"{self.nome}.delta-{numero:04d}.pkl")
+
+    @property
+    def _caminho_watermark(self) -> str:
+        return os.path.join(self.diretorio, f"{self.nome}.watermark.json")
+
+    @property
+    def vazia(self) -> bool:
+        return self._df is None or self._df.empty
+
+    def _carregar_do_disco(self) -> None:
+        try:
+            with open(self._caminho_watermark, encoding="utf-8") as arquivo:
+                self.watermark = json.load(arquivo)
+            df = pd.read_pickle(self._caminho_dados)
+            # Os deltas são reaplicados na ordem em que foram gravados
+            for numero in range(self.watermark.get("deltas", 0)):
+                df = self._mesclar(df, pd.read_pickle(self._caminho_delta(numero)))
+            if self.coluna_data in df.columns:
+                df = ordenar_por_data(df, self.coluna_data)
+            self._df = df
+        except (OSError, ValueError) as e:
+            if os.path.exists(self._caminho_dados):
+                logger.warning(f"Base local '{self.nome}' ilegível, será reconstruída: {e}")
+            self._df, self.watermark = None, {}
+            return
+        logger.info(f"Base local '{self.nome}' carregada com {len(self._df)} chamados. Watermark: {self.watermark}")
+
+    @staticmethod
+    def _gravar_pickle(df: pd.DataFrame, caminho: str) -> None:
+        df.to_pickle(caminho + ".tmp")
+        os.replace(caminho + ".tmp", caminho)
+
+    def _salvar_em_disco(self, delta: pd.DataFrame, completo: bool) -> None:
+        # O watermark é gravado por último: é ele que diz quantos deltas valem sobre a base
+        deltas = self.watermark.get("deltas", 0)
+        if completo or deltas >= Config.TICKET_STORE_MAX_DELTAS:
+            self._gravar_pickle(self._df, self._caminho_dados)
+            self.watermark["deltas"] = 0
+        elif not delta.empty:
+            self._gravar_pickle(delta, self._caminho_delta(deltas))
+            self.watermark["deltas"] = deltas + 1
+        with open(self._caminho_watermark + ".tmp", "w", encoding="utf-8") as arquivo:
+            json.dump(self.watermark, arquivo)
+        os.replace(self._caminho_watermark + ".tmp", self._caminho_watermark)
+        if self.watermark.get("deltas", 0) == 0:
+            for numero in range(deltas):
+                try:
+                    os.remove(self._caminho_delta(numero))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _mesclar(atual: Optional[pd.DataFrame], delta: pd.DataFrame) -> pd.DataFrame:
+        if atual is None or atual.empty:
+            return delta
+        combinado = pd.concat([atual.drop(index=delta.index.intersection(atual.index)), delta])
+        # concat de categóricos com categorias diferentes vira object
+        for coluna in delta.columns:
+            if isinstance(delta[coluna].dtype, pd.CategoricalDtype):
+                combinado[coluna] = combinado[coluna].astype("category")
+        return combinado
+
+    def _formatar(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.drop(columns=[COLUNA_HASH]).reset_index()
+
+    def _publicar(self) -> pd.DataFrame:
+        if self._publicado is None:
+            self._publicado = pd.DataFrame() if self._df is None else self._formatar(self._df)
+        return self._publicado
+
+    def dados(self) -> pd.DataFrame:
+        """
+        Base completa, sem a coluna interna de hash. Até o próximo upsert todas as chamadas
+        devolvem o mesmo DataFrame, que deve ser tratado como somente leitura.
+        """
+        with self._lock:
+            return self._publicar()
+
+    def manter_agregado(self, nome: str, chave: Any, construir: Callable[[pd.DataFrame], Any],
+                        atualizar: Callable[[Any, pd.DataFrame, Dict[str, Any]], Any]) -> None:
+        """
+        Registra um agregado derivado da base, mantido entre os upserts.
+
+        Args:
+            nome: Identificador do agregado
+            chave: Versão das demais entradas do agregado; registrar de novo com outra
+                chave descarta o objeto construído, com a mesma chave não faz nada
+            construir: Recebe a base (formato de dados()) e devolve o agregado
+            atualizar: Recebe o agregado, a base já atualizada e a alteração do upsert
+                ('dias_afetados', 'novos', 'anteriores' e 'linhas_dos_dias', todos no
+                formato de dados()) e devolve o novo agregado, sem alterar o anterior
+        """
+        with self._lock:
+            registrado = self._agregados.get(nome)
+            if registrado is None or registrado["chave"] != chave:
+                self._agregados[nome] = {"chave": chave, "construir": construir, "atualizar": atualizar, "valor": None}
+
+    def agregado(self, nome: str, dados: pd.DataFrame) -> Any:
+        """
+        Agregado `nome` correspondente a `dados`, construído na primeira consulta e depois
+        só atualizado pelos upserts. Devolve None se `dados` não for a base publicada atual
+        (um snapshot anterior ainda em uso), caso em que quem chama constrói o seu.
+        """
+        with self._lock:
+            if dados is not self._publicado or nome not in self._agregados:
+                return None
+            registrado = self._agregados[nome]
+            if registrado["valor"] is None:
+                registrado["valor"] = registrado["construir"](dados)
+            return registrado["valor"]
+
+    def _atualizar_agregados(self, alteracao: Dict[str, Any]) -> None:
+        dados = self._publicar()
+        for nome, registrado in self._agregados.items():
+            if registrado["valor"] is None:
+                continue
+            try:
+                registrado["valor"] = registrado["atualizar"](registrado["valor"], dados, alteracao)
+            except Exception as e:
+                # Sem atualização possível, o agregado é reconstruído da base na próxima consulta
+                logger.warning(f"Agregado '{nome}' da base '{self.nome}' será reconstruído: {e}")
+                registrado["valor"] = None
+
+    def _linhas_dos_dias(self, dados: pd.DataFrame, dias: Set) -> pd.DataFrame:
+        # A base está ordenada por data: cada dia é uma fatia contígua encontrada por busca binária
+        if not dias or self.coluna_data not in dados.columns:
+            return dados.iloc[:0]
+        datas = dados[self.coluna_data]
+        datas = datas.to_numpy(dtype="datetime64[ns]")[:int(datas.notna().sum())]
+        inicios = np.array(sorted(pd.Timestamp(dia).to_datetime64() for dia in dias), dtype="datetime64[ns]")
+        primeiros = np.searchsorted(datas, inicios, "left")
+        ultimos = np.searchsorted(datas, inicios + np.timedelta64(1, "D"), "left")
+        return dados.iloc[np.concatenate([np.arange(p, u) for p, u in zip(primeiros, ultimos)])]
+
+    def upsert(self, df_exportacao: pd.DataFrame, last_modified: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Mescla uma exportação na base: insere chamados novos, substitui os alterados
+        e mantém os que não vieram nesta exportação. Os agregados registrados são
+        atualizados com o delta.
+
+        Returns:
+            Dict com 'inseridos', 'atualizados', 'dias_afetados' e o 'watermark' atualizado
+        """
+        if df_exportacao.empty or self.coluna_chave not in df_exportacao.columns:
+            return {"inseridos": 0, "atualizados": 0, "dias_afetados": set(), "watermark": self.watermark}
+
+        novos = df_exportacao.dropna(subset=[self.coluna_chave]).drop_duplicates(subset=[self.coluna_chave], keep="last")
+        novos = novos.assign(**{COLUNA_HASH: pd.util.hash_pandas_object(novos, index=False).to_numpy()})
+        novos = novos.set_index(self.coluna_chave)
+
+        with self._lock:
+            atual = self._df
+            if atual is None or atual.empty:
+                delta = novos
+                existentes = pd.Index([])
+                anteriores = novos.iloc[:0]
+            else:
+                hash_anterior = atual[COLUNA_HASH].reindex(novos.index)
+                delta = novos[hash_anterior.to_numpy() != novos[COLUNA_HASH].to_numpy()]
+                existentes = delta.index.intersection(atual.index)
+                anteriores = atual.loc[existentes]
+
+            # Um chamado alterado também afeta o dia em que ele estava antes
+            dias_afetados = set(_dias(delta, self.coluna_data)) | set(_dias(anteriores, self.coluna_data))
+            if delta.empty:
+                logger.info(f"Exportação sem chamados novos ou alterados para a base '{self.nome}'.")
+            else:
+                combinado = self._mesclar(atual, delta)
+                if self.coluna_data in combinado.columns:
+                    combinado = ordenar_por_data(combinado, self.coluna_data)
+                self._df = combinado
+                self._publicado = None
+
+            if self.coluna_data in self._df.columns:
+                maximo = self._df[self.coluna_data].max()
+                self.watermark["max_data_criacao"] = None if pd.isna(maximo) else pd.Timestamp(maximo).isoformat()
+            if last_modified:
+                self.watermark["last_modified"] = last_modified
+            self.watermark["total_chamados"] = int(len(self._df))
+            self._salvar_em_disco(delta, completo=atual is None or atual.empty)
+
+            if not delta.empty:
+                self._atualizar_agregados({
+                    "dias_afetados": dias_afetados,
+                    "novos": self._formatar(delta),
+                    "anteriores": self._formatar(anteriores),
+                    "linhas_dos_dias": self._linhas_dos_dias(self._publicar(), dias_afetados),
+                })
+
+        resultado = {
+            "inseridos": int(len(delta) - len(existentes)),
+            "atualizados": int(len(existentes)),
+            "dias_afetados": dias_afetados,
+            "watermark": dict(self.watermark),
+        }
+        logger.info(
+            f"Upsert na base '{self.nome}': {resultado['inseridos']} inseridos, "
+            f"{resultado['atualizados']} atualizados, {len(dias_afetados)} dia(s) afetado(s)."
+        )
+        return resultado
+
+
+def ordenar_por_data(df: pd.DataFrame, coluna_data: str) -> pd.DataFrame:
+    """Chamados em ordem crescente de `coluna_data` (estável, sem data no fim); já ordenados são devolvidos como estão."""
+    datas = df[coluna_data]
+    com_data = datas.notna().to_numpy()
+    num_com_data = int(com_data.sum())
+    if com_data[:num_com_data].all() and datas.iloc[:num_com_data].is_monotonic_increasing:
+        return df
+    return df.sort_values(coluna_data, kind="stable", na_position="last")
+
+
+class IndiceTemporal:
+    """
+    Chamados ordenados por data, com os limites do período em cache.
+
+    Um filtro de período vira duas buscas binárias sobre as datas ordenadas e
+    uma fatia contígua (`iloc`) do DataFrame, sem varrer nem copiar as linhas.
+    Chamados sem data ficam no fim e nunca entram num filtro de período.
+    """
+
+    def __init__(self, df: pd.DataFrame, coluna_data: str = "Data de Criação"):
+        self.coluna_data = coluna_data
+        self.df = ordenar_por_data(df, coluna_data)
+        datas = self.df[coluna_data]
+        self._datas = datas.to_numpy(dtype="datetime64[ns]")[:int(datas.notna().sum())]
+        self.data_min = pd.Timestamp(self._datas[0]) if len(self._datas) else None
+        self.data_max = pd.Timestamp(self._datas[-1]) if len(self._datas) else None
+
+    def posicoes(self, inicio=None, fim=None) -> slice:
+        """Fatia das linhas com `inicio <= data < fim` (None: sem limite daquele lado, incluindo só as com data)."""
+        primeiro = 0 if inicio is None else int(np.searchsorted(self._datas, pd.Timestamp(inicio).to_datetime64(), "left"))
+        ultimo = len(self._datas) if fim is None else int(np.searchsorted(self._datas, pd.Timestamp(fim).to_datetime64(), "left"))
+        return slice(primeiro, max(primeiro, ultimo))
+
+    def filtrar(self, inicio=None, fim=None) -> pd.DataFrame:
+        """Chamados com `inicio <= data < fim`, como fatia contígua do DataFrame ordenado."""
+        return self.df.iloc[self.posicoes(inicio, fim)]
+
+
+def _dias(df: pd.DataFrame, coluna_data: str):
+    if df.empty or coluna_data not in df.columns:
+        return []
+    return df[coluna_data].dropna().dt.normalize().unique()
+
+
+_stores: Dict[str, TicketStore] = {}
+_stores_lock = threading.Lock()
+
+
+def obter_ticket_store(nome: str) -> TicketStore:
+    """Retorna a TicketStore compartilhada pelo processo para a fonte `nome`."""
+    with _stores_lock:
+        if nome not in _stores:
+            _stores[nome] = TicketStore(nome)
+        return _stores[nome]